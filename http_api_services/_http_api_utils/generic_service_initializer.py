@@ -1,9 +1,28 @@
 # generic_service_initializer.py
-from flask import Flask, jsonify, request
+import json
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+
+class HttpError(Exception):
+    """Erro de handler que deve ser respondido com um status HTTP específico."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _to_sse(events):
+    # Formata cada evento como Server-Sent Event ("data: <json>\n\n")
+    try:
+        for event in events:
+            yield f"data: {json.dumps(event)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
 
 
 def create_flask_service(
-    manager_cls, route_config, host="0.0.0.0", port=5000, debug=True
+    manager_cls, route_config, host="0.0.0.0", port=5000, debug=True, manager=None
 ):
     """
     Cria uma aplicação Flask genérica a partir de uma classe gerenciadora e um conjunto de rotas.
@@ -14,26 +33,42 @@ def create_flask_service(
             {
                 'endpoint': str (ex: '/files'),
                 'methods': list (ex: ['POST']),
-                'handler': função que recebe (manager, request) e retorna uma resposta (dict ou lista)
+                'handler': função que recebe (manager, request) e retorna uma resposta (dict ou lista),
+                'stream': bool opcional (padrão False). Se True, o handler retorna um
+                          iterável de dicts, enviados um a um como Server-Sent Events.
             }
         host: Host para rodar o serviço (padrão '0.0.0.0').
         port: Porta para rodar o serviço (padrão 5000).
         debug: Se True, ativa o modo debug do Flask.
+        manager: Instância já criada do gerenciador (opcional). Permite que a rota HTTP
+            e chamadas in-process compartilhem o mesmo estado.
     """
 
     app = Flask(manager_cls.__name__)
-    manager = manager_cls()
+    if manager is None:
+        manager = manager_cls()
 
     for route in route_config:
         endpoint = route.get("endpoint", "/")
         methods = route.get("methods", ["GET"])
         handler_fn = route.get("handler")
+        stream = route.get("stream", False)
 
-        def handle_route():
+        # handler_fn e stream entram como default args para que cada rota
+        # guarde o seu próprio handler (e não o da última rota do loop)
+        def handle_route(handler_fn=handler_fn, stream=stream):
             try:
                 # Chamamos a função handler passando o manager e a request
                 response = handler_fn(manager, request)
+                if stream:
+                    return Response(
+                        stream_with_context(_to_sse(response)),
+                        mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache"},
+                    )
                 return jsonify(response), 200
+            except HttpError as e:
+                return jsonify({"error": str(e)}), e.status_code
             except Exception as e:
                 return jsonify({"error": str(e)}), 400
 
@@ -0,0 +1,198 @@
+# service_host.py
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+
+import requests
+from dotenv import dotenv_values
+from werkzeug.serving import make_server
+
+from http_api_services._http_api_utils.generic_service_initializer import (
+    HttpError,
+    create_flask_service,
+)
+
+
+class _InProcessRequest:
+    """
+    Imita o pedaço do `flask.request` que os handlers usam. O payload não é
+    serializado: o handler recebe uma cópia rasa (o primeiro nível do dict é
+    novo, mas listas/arrays dentro dele são os mesmos objetos de quem chamou).
+    """
+
+    def __init__(self, payload, method="POST"):
+        self.method = method
+        self.json = dict(payload) if isinstance(payload, dict) else payload
+        self.args = {}
+
+    def get_json(self, *args, **kwargs):
+        return self.json
+
+
+def _guard_stream(events):
+    # Mesmo contrato do _to_sse: um erro no meio do stream vira um último
+    # evento {"error": ...}, que é o que o HttpClient entrega nesse caso
+    try:
+        yield from events
+    except Exception as e:
+        yield {"error": str(e)}
+
+
+class InProcessClient:
+    """
+    Chama os handlers de um serviço hospedado no mesmo processo.
+
+    Erros seguem o contrato do create_flask_service e, como no HttpClient,
+    voltam como {"error": ..., "status_code": ...}.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def call(self, endpoint: str, payload=None, method: str = "POST"):
+        route = self.service["routes"].get(endpoint)
+        if route is None:
+            return {"error": f"Endpoint not found: {endpoint}", "status_code": 404}
+        try:
+            response = route["handler"](
+                self.service["manager"], _InProcessRequest(payload, method)
+            )
+            if route.get("stream", False):
+                return _guard_stream(response)
+            return response
+        except HttpError as e:
+            # Mantém o status (ex: 429 fila cheia, 504 timeout) para quem chama
+            return {"error": str(e), "status_code": e.status_code}
+        except Exception as e:
+            return {"error": str(e), "status_code": 400}
+
+
+class HttpClient:
+    """Chama um serviço remoto via HTTP."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def call(self, endpoint: str, payload=None, method: str = "POST"):
+        response = self._session.request(
+            method,
+            self.base_url + endpoint,
+            json=payload,
+            timeout=self.timeout,
+            stream=True,
+        )
+        if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            return self._iter_sse(response)
+        result = response.json()
+        if not response.ok and isinstance(result, dict):
+            result["status_code"] = response.status_code
+        return result
+
+    @staticmethod
+    def _iter_sse(response):
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith("data: "):
+                yield json.loads(line[len("data: "):])
+
+
+class ServiceHost:
+    """
+    Hospeda vários serviços num único processo a partir dos seus `.env`.
+
+    Cada `.env` informa:
+        ENDPOINT        -> nome do serviço (ex: files-manager)
+        PORT / HOST     -> onde o serviço atende via HTTP
+        SERVICE_MODULE  -> módulo que define `manager_cls` e `routes`
+        TRANSPORT       -> "inprocess" (hospedado aqui, chamado direto) ou
+                           "http" (remoto, chamado via HOST:PORT)
+
+    O transporte é escolhido só pela configuração: quem chama usa
+    `host.connect(nome).call(endpoint, payload)` nos dois casos.
+    """
+
+    def __init__(self):
+        self.services = {}
+        self._servers = []
+
+    def load_service(self, env_path: str) -> str:
+        """
+        Carrega um serviço a partir do seu `.env`.
+
+        Returns:
+            str: Nome do serviço (ENDPOINT).
+        """
+        config = dotenv_values(env_path)
+        name = config["ENDPOINT"]
+        # Variável de ambiente <ENDPOINT>_TRANSPORT sobrescreve o .env
+        env_override = os.getenv(f"{name.upper().replace('-', '_')}_TRANSPORT")
+        transport = (env_override or config.get("TRANSPORT") or "inprocess").lower()
+
+        service = {
+            "config": config,
+            "transport": transport,
+            "host": config.get("HOST", "127.0.0.1"),
+            "port": int(config.get("PORT", 5000)),
+        }
+
+        if transport == "inprocess":
+            module = importlib.import_module(config["SERVICE_MODULE"])
+            service["manager_cls"] = module.manager_cls
+            service["manager"] = module.manager_cls()
+            service["route_config"] = module.routes
+            service["routes"] = {route["endpoint"]: route for route in module.routes}
+        elif transport != "http":
+            raise ValueError(f"Unsupported transport: {transport}")
+
+        self.services[name] = service
+        logging.info(f"Serviço {name} carregado ({transport}).")
+        return name
+
+    def connect(self, name: str):
+        """
+        Retorna o cliente do serviço conforme o transporte configurado.
+        """
+        service = self.services[name]
+        if service["transport"] == "inprocess":
+            return InProcessClient(service)
+        return HttpClient(f"http://{service['host']}:{service['port']}")
+
+    def serve_http(self, host: str = "0.0.0.0") -> None:
+        """
+        Expõe via HTTP os serviços hospedados aqui, para clientes remotos.
+        A rota HTTP usa a mesma instância de manager das chamadas in-process.
+        """
+        for name, service in self.services.items():
+            if service["transport"] != "inprocess":
+                continue
+            app = create_flask_service(
+                service["manager_cls"],
+                service["route_config"],
+                manager=service["manager"],
+            )
+            server = make_server(host, service["port"], app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+            logging.info(f"Serviço {name} atendendo HTTP na porta {service['port']}.")
+
+    def shutdown(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+        self._servers = []
+
+
+if __name__ == "__main__":
+    # Exemplo de uso (a partir da raiz do repositório):
+    #   python -m http_api_services._http_api_utils.service_host \
+    #       http_api_services/action_services/local_folders_comm_manager/.env \
+    #       http_api_services/action_services/vkb_manager/.env
+    logging.basicConfig(level=logging.INFO)
+    host = ServiceHost()
+    for env_path in sys.argv[1:]:
+        host.load_service(env_path)
+    host.serve_http()
+    threading.Event().wait()
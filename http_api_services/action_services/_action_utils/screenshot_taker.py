@@ -41,16 +41,26 @@ class ScreenshotTaker:
         """Capture a screenshot of the region (left, top, right, bottom)."""
         return ImageGrab.grab(bbox=(left, top, right, bottom))
 
-    def _capture_window_screenshot(self, hwnd):
+    def _capture_window_screenshot(self, hwnd, roi=None):
         """
         Given a hwnd, return a PIL Image of that window.
         This function composes the others: it gets the rect and then captures it.
+        If roi (left, top, right, bottom, relative to the window) is given,
+        only that sub-rect is grabbed.
         """
         rect = self._get_window_rect(hwnd)
         left, top, right, bottom = rect
+        if roi is not None:
+            roi_left, roi_top, roi_right, roi_bottom = roi
+            left, top, right, bottom = (
+                left + roi_left,
+                top + roi_top,
+                min(right, left + roi_right),
+                min(bottom, top + roi_bottom),
+            )
         return self._capture_region(left, top, right, bottom)
 
-    def take_screenshot_of_window(self, title_fragment):
+    def take_screenshot_of_window(self, title_fragment, roi=None):
         # List all windows
         windows = self._list_all_windows()
         # Find the desired window
@@ -63,7 +73,7 @@ class ScreenshotTaker:
         self._focus_window(hwnd)
 
         # Capture screenshot of that window
-        img = self._capture_window_screenshot(hwnd)
+        img = self._capture_window_screenshot(hwnd, roi)
         return img
 
 
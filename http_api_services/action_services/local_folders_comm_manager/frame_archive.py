@@ -0,0 +1,256 @@
+import json
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Cabeçalho de cada tile no arquivo de dados: (tile_x, tile_y, tamanho comprimido)
+_TILE_HEADER = struct.Struct("<HHI")
+
+
+class FrameArchive:
+    """
+    Arquivo de gravação de tela para uma sessão de capturas.
+
+    Cada frame é quebrado em tiles de `tile_size` x `tile_size`. Um keyframe
+    guarda todos os tiles; os demais frames guardam só os tiles que mudaram,
+    como XOR contra o frame anterior (quase tudo zero -> comprime muito bem).
+    Os tiles são comprimidos com zlib num pool de threads.
+
+    Arquivos:
+        <nome>.frames      -> dados dos tiles, só append
+        <nome>.frames.idx  -> índice JSON lines, um registro por frame
+                              (offset, tamanho, tipo, keyframe de referência)
+
+    Para ler o frame i, decodifica-se a partir do keyframe dele; um keyframe
+    novo é gravado a cada `keyframe_interval` frames (ou se o tamanho mudar),
+    o que limita o custo de acesso aleatório.
+    """
+
+    def __init__(
+        self,
+        path,
+        tile_size: int = 64,
+        keyframe_interval: int = 60,
+        compression_level: int = 1,
+        workers: int = 4,
+        executor: ThreadPoolExecutor = None,
+    ):
+        """
+        Args:
+            executor (ThreadPoolExecutor): Pool de compressão compartilhado entre
+                vários arquivos. Se None, o arquivo cria o próprio pool com
+                `workers` threads e o encerra no close().
+        """
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+
+        self.index = []
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = [json.loads(line) for line in f if line.strip()]
+
+        # Último frame escrito/lido, para não decodificar de novo em acessos sequenciais
+        self._last_frame = None
+        self._last_frame_idx = None
+        self._write_ms_total = 0.0
+        self._frames_this_session = 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def append(self, img: Image.Image) -> dict:
+        """
+        Grava um frame no fim do arquivo.
+
+        Returns:
+            dict: Índice do frame, tipo, bytes gravados e latência de escrita (ms).
+        """
+        start = time.perf_counter()
+        frame = np.asarray(img.convert("RGB"), dtype=np.uint8)
+
+        with self._lock:
+            frame_idx = len(self.index)
+            previous = self._previous_frame()
+
+            is_keyframe = (
+                previous is None
+                or previous.shape != frame.shape
+                or frame_idx - self.index[-1]["keyframe"] >= self.keyframe_interval
+            )
+
+            if is_keyframe:
+                tiles = list(self._all_tiles(frame.shape))
+                payloads = self._encode_tiles(frame, None, tiles)
+            else:
+                tiles = self._changed_tiles(previous, frame)
+                payloads = self._encode_tiles(frame, previous, tiles)
+
+            data = b"".join(
+                _TILE_HEADER.pack(tx, ty, len(payload)) + payload
+                for (tx, ty), payload in zip(tiles, payloads)
+            )
+
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+
+            record = {
+                "frame": frame_idx,
+                "type": "key" if is_keyframe else "delta",
+                "keyframe": frame_idx if is_keyframe else self.index[-1]["keyframe"],
+                "offset": offset,
+                "length": len(data),
+                "tiles": len(tiles),
+                "width": frame.shape[1],
+                "height": frame.shape[0],
+            }
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self.index.append(record)
+
+            self._last_frame = frame
+            self._last_frame_idx = frame_idx
+
+            write_ms = (time.perf_counter() - start) * 1000
+            self._write_ms_total += write_ms
+            self._frames_this_session += 1
+
+        return {
+            "frame": frame_idx,
+            "type": record["type"],
+            "bytes": len(data),
+            "write_ms": write_ms,
+        }
+
+    def read(self, frame_idx: int) -> Image.Image:
+        """
+        Reconstrói o frame `frame_idx` (aceita índices negativos).
+        """
+        with self._lock:
+            return Image.fromarray(self._decode(frame_idx))
+
+    def stats(self) -> dict:
+        frames = len(self.index)
+        total_bytes = sum(record["length"] for record in self.index)
+        return {
+            "frames": frames,
+            "keyframes": sum(1 for record in self.index if record["type"] == "key"),
+            "bytes": total_bytes,
+            "bytes_per_frame": total_bytes / frames if frames else 0,
+            "frames_this_session": self._frames_this_session,
+            "avg_write_ms_this_session": (
+                self._write_ms_total / self._frames_this_session
+                if self._frames_this_session
+                else 0
+            ),
+        }
+
+    def close(self) -> None:
+        """
+        Libera o frame em cache (e o pool, se for próprio). O objeto continua
+        utilizável: o último frame é reconstruído do disco quando precisar.
+        """
+        with self._lock:
+            self._last_frame = None
+            self._last_frame_idx = None
+        if self._owns_executor:
+            self._executor.shutdown()
+
+    # ------------------------------------------------------------ internals
+
+    def _previous_frame(self):
+        if not self.index:
+            return None
+        if self._last_frame_idx != len(self.index) - 1:
+            # Arquivo reaberto: reconstrói o último frame uma vez
+            self._decode(len(self.index) - 1)
+        return self._last_frame
+
+    def _decode(self, frame_idx: int) -> np.ndarray:
+        if frame_idx < 0:
+            frame_idx += len(self.index)
+        if not 0 <= frame_idx < len(self.index):
+            raise IndexError(f"Frame {frame_idx} not in archive")
+
+        keyframe = self.index[frame_idx]["keyframe"]
+        # Continua do último frame decodificado se ele estiver no mesmo trecho
+        if (
+            self._last_frame_idx is not None
+            and keyframe <= self._last_frame_idx <= frame_idx
+        ):
+            frame = self._last_frame.copy()
+            start = self._last_frame_idx + 1
+        else:
+            record = self.index[keyframe]
+            frame = np.zeros((record["height"], record["width"], 3), dtype=np.uint8)
+            start = keyframe
+
+        with open(self.path, "rb") as f:
+            for idx in range(start, frame_idx + 1):
+                record = self.index[idx]
+                f.seek(record["offset"])
+                self._apply(frame, f.read(record["length"]), record["type"] == "key")
+
+        self._last_frame = frame
+        self._last_frame_idx = frame_idx
+        return frame
+
+    def _apply(self, frame: np.ndarray, data: bytes, is_keyframe: bool) -> None:
+        size = self.tile_size
+        pos = 0
+        while pos < len(data):
+            tx, ty, length = _TILE_HEADER.unpack_from(data, pos)
+            pos += _TILE_HEADER.size
+            region = frame[ty * size : (ty + 1) * size, tx * size : (tx + 1) * size]
+            tile = np.frombuffer(zlib.decompress(data[pos : pos + length]), dtype=np.uint8)
+            tile = tile.reshape(region.shape)
+            pos += length
+            if is_keyframe:
+                region[...] = tile
+            else:
+                region ^= tile
+
+    def _all_tiles(self, shape):
+        size = self.tile_size
+        for ty in range(-(-shape[0] // size)):
+            for tx in range(-(-shape[1] // size)):
+                yield tx, ty
+
+    def _changed_tiles(self, previous: np.ndarray, frame: np.ndarray):
+        size = self.tile_size
+        height, width = frame.shape[:2]
+        changed = np.any(previous != frame, axis=2)
+
+        # Completa até múltiplo do tile para poder agrupar por bloco
+        pad_h, pad_w = -height % size, -width % size
+        if pad_h or pad_w:
+            changed = np.pad(changed, ((0, pad_h), (0, pad_w)))
+        blocks = changed.reshape(changed.shape[0] // size, size, changed.shape[1] // size, size)
+        ys, xs = np.nonzero(blocks.any(axis=(1, 3)))
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def _encode_tiles(self, frame, previous, tiles):
+        size = self.tile_size
+
+        def encode(tile):
+            tx, ty = tile
+            region = frame[ty * size : (ty + 1) * size, tx * size : (tx + 1) * size]
+            if previous is not None:
+                region = region ^ previous[ty * size : (ty + 1) * size, tx * size : (tx + 1) * size]
+            # zlib libera o GIL, então os tiles comprimem em paralelo
+            return zlib.compress(np.ascontiguousarray(region).tobytes(), self.compression_level)
+
+        return list(self._executor.map(encode, tiles))
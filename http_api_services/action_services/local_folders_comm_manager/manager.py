@@ -1,9 +1,22 @@
+import logging
 import os
 import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from PIL import Image
+
+from http_api_services.action_services.local_folders_comm_manager.frame_archive import (
+    FrameArchive,
+)
+
 
 class LocalFoldersCommManager:
+    # Arquivos de frames mantidos abertos; o menos usado é fechado além disso
+    MAX_OPEN_ARCHIVES = 8
+
     def __init__(
         self,
         base_path: str = "./http_api_services/llam_services/_llam_utils/local_llam_comm",
@@ -13,6 +26,8 @@ class LocalFoldersCommManager:
         self.file_config = {
             "img": {
                 "allowed_exts": [".jpeg", ".jpg", ".png"],
+                # Sessões de captura: cada create/update acrescenta um frame
+                "archive_ext": ".frames",
             },
             "script": {
                 # Scripts podem ter qualquer extensão de texto.
@@ -23,6 +38,34 @@ class LocalFoldersCommManager:
             "task": {"ext": ".txt"},
         }
 
+        # Funções chamadas após cada create/update/delete bem sucedido
+        self._hooks = []
+
+        # Arquivos de frames abertos (LRU), mantidos para não reconstruir o
+        # último frame a cada captura nova. Todos comprimem no mesmo pool.
+        self._archives = OrderedDict()
+        self._archives_lock = threading.Lock()
+        self._frames_executor = ThreadPoolExecutor(max_workers=4)
+
+    def add_hook(self, hook):
+        """
+        Registra uma função chamada após cada create/update/delete bem sucedido.
+
+        A função recebe (operation, file_path, file_type, folder_name), onde
+        file_path é o Path absoluto do arquivo afetado.
+        """
+        self._hooks.append(hook)
+
+    def _run_hooks(self, operation, result, file_type, folder_name):
+        if "error" in result:
+            return
+        file_path = (self.base_path / result["filename"]).resolve()
+        for hook in self._hooks:
+            try:
+                hook(operation, file_path, file_type, folder_name)
+            except Exception as e:
+                logging.error(f"Erro no hook de {operation} para {file_path}: {e}")
+
     def handle_operation(
         self,
         operation: str,
@@ -37,6 +80,7 @@ class LocalFoldersCommManager:
         tipo: str = None,
         recursive: bool = False,
         script_ext: str = None,
+        frame: int = None,
     ):
         """
         Operações suportadas:
@@ -44,6 +88,7 @@ class LocalFoldersCommManager:
           - update: atualiza um arquivo existente
           - delete: deleta um arquivo existente
           - list: lista a estrutura da pasta
+          - read: extrai um frame de um arquivo de frames (img com extensão .frames)
 
         folder_name: nome da pasta onde a operação será realizada
         file_type: 'img', 'script', 'info', 'task'
@@ -53,6 +98,13 @@ class LocalFoldersCommManager:
         autor, data, titulo, tipo: usado para gerar um filename se não for fornecido.
         recursive: se True, a listagem é recursiva para pastas
         script_ext: extensão opcional a ser usada para script caso não seja dado filename.
+        frame: índice do frame para 'read' (padrão: último; aceita negativos).
+
+        Para img, se o filename terminar em .frames, create/update acrescentam a
+        imagem de `content` como um novo frame do arquivo (delta contra o frame
+        anterior), e read grava o frame pedido como imagem em `content` (path
+        relativo à pasta do arquivo; padrão: "<nome>_frame<i>.png" ao lado dele)
+        e retorna o path. A saída precisa ficar dentro de base_path.
         """
 
         # Verifica se o tipo de arquivo é suportado
@@ -67,19 +119,33 @@ class LocalFoldersCommManager:
             file_path = self._prepare_new_file_path(
                 folder_path, file_type, filename, autor, data, titulo, tipo, script_ext
             )
-            return self._create(file_path, file_type, content, status)
+            result = self._create(file_path, file_type, content, status)
+            self._run_hooks(operation, result, file_type, folder_name)
+            return result
 
         elif operation == "update":
             if not filename:
                 raise ValueError("filename is required for update")
             file_path = folder_path / filename
-            return self._update(file_path, file_type, content, status)
+            result = self._update(file_path, file_type, content, status)
+            self._run_hooks(operation, result, file_type, folder_name)
+            return result
 
         elif operation == "delete":
             if not filename:
                 raise ValueError("filename is required for delete")
             file_path = folder_path / filename
-            return self._delete_file(file_path)
+            result = self._delete_file(file_path)
+            self._run_hooks(operation, result, file_type, folder_name)
+            return result
+
+        elif operation == "read":
+            if not filename:
+                raise ValueError("filename is required for read")
+            file_path = folder_path / filename
+            if file_type != "img" or file_path.suffix != self.file_config["img"]["archive_ext"]:
+                raise ValueError("read is only supported for img frame archives")
+            return self._read_frame(file_path, frame, content)
 
         elif operation == "list":
             # Listar a pasta (e subpastas se recursive=True)
@@ -140,6 +206,9 @@ class LocalFoldersCommManager:
 
     # CREATE/UPDATE para IMG
     def _create_image(self, file_path, content):
+        if file_path.suffix == self.file_config["img"]["archive_ext"]:
+            return self._append_frame(file_path, content)
+
         # content é um filepath de uma imagem existente
         if content is None or not os.path.exists(content):
             return {"error": "Invalid image content path"}
@@ -158,6 +227,9 @@ class LocalFoldersCommManager:
         return {"message": "Image created", "filename": relative_path}
 
     def _update_image(self, file_path, content):
+        if file_path.suffix == self.file_config["img"]["archive_ext"]:
+            return self._append_frame(file_path, content)
+
         if content is None or not os.path.exists(content):
             return {"error": "Invalid image content path"}
 
@@ -171,6 +243,68 @@ class LocalFoldersCommManager:
         relative_path = str(file_path.relative_to(self.base_path))
         return {"message": "Image updated", "filename": relative_path}
 
+    # ARQUIVOS DE FRAMES (sessões de captura)
+    def _get_archive(self, file_path):
+        key = file_path.resolve()
+        with self._archives_lock:
+            if key in self._archives:
+                self._archives.move_to_end(key)
+                return self._archives[key]
+
+            archive = FrameArchive(file_path, executor=self._frames_executor)
+            self._archives[key] = archive
+            if len(self._archives) > self.MAX_OPEN_ARCHIVES:
+                _, idle_archive = self._archives.popitem(last=False)
+                idle_archive.close()
+            return archive
+
+    def _append_frame(self, file_path, content):
+        if content is None or not os.path.exists(content):
+            return {"error": "Invalid image content path"}
+
+        source_ext = Path(content).suffix.lower()
+        if source_ext not in self.file_config["img"]["allowed_exts"]:
+            return {"error": f"Unsupported image extension: {source_ext}"}
+
+        with Image.open(content) as img:
+            frame_info = self._get_archive(file_path).append(img)
+
+        relative_path = str(file_path.relative_to(self.base_path))
+        return {"message": "Frame stored", "filename": relative_path, **frame_info}
+
+    def _read_frame(self, file_path, frame, content):
+        if not file_path.exists():
+            return {"error": "File not found"}
+
+        archive = self._get_archive(file_path)
+        frame_idx = -1 if frame is None else int(frame)
+        try:
+            img = archive.read(frame_idx)
+        except IndexError as e:
+            return {"error": str(e)}
+
+        frame_idx %= len(archive)
+        if content is None:
+            content = f"{file_path.stem}_frame{frame_idx}.png"
+
+        # A saída fica sempre dentro de base_path (content vem do cliente)
+        output_path = (file_path.parent / content).resolve()
+        try:
+            output_path.relative_to(self.base_path.resolve())
+        except ValueError:
+            return {"error": "Output path must be inside base_path"}
+        if output_path.suffix.lower() not in self.file_config["img"]["allowed_exts"]:
+            return {"error": "Invalid output image extension"}
+        img.save(output_path)
+
+        relative_path = str(file_path.relative_to(self.base_path))
+        return {
+            "message": "ok",
+            "filename": relative_path,
+            "frame": frame_idx,
+            "content": str(output_path.relative_to(self.base_path.resolve())),
+        }
+
     # CREATE/UPDATE para TEXTOS
     def _create_text_file(self, file_path, file_type, content, status):
         # Determina a extensão correta se ainda estiver vazia
@@ -213,6 +347,13 @@ class LocalFoldersCommManager:
     # DELETE
     def _delete_file(self, file_path):
         if file_path.exists():
+            if file_path.suffix == self.file_config["img"]["archive_ext"]:
+                # Arquivo de frames: fecha e remove também o índice
+                with self._archives_lock:
+                    archive = self._archives.pop(file_path.resolve(), None)
+                if archive is not None:
+                    archive.close()
+                file_path.with_name(file_path.name + ".idx").unlink(missing_ok=True)
             file_path.unlink()
             relative_path = str(file_path.relative_to(self.base_path))
             return {"message": "File deleted", "filename": relative_path}
@@ -28,6 +28,7 @@ def local_folders_handler(manager, request):
     tipo = data.get("tipo")
     recursive = data.get("recursive", False)
     script_ext = data.get("script_ext")
+    frame = data.get("frame")
 
     # Executa a lógica do manager
     result = manager.handle_operation(
@@ -43,6 +44,7 @@ def local_folders_handler(manager, request):
         tipo=tipo,
         recursive=recursive,
         script_ext=script_ext,
+        frame=frame,
     )
 
     return result
@@ -0,0 +1,100 @@
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from http_api_services.action_services.vkb_manager.vector_store import VectorStore
+
+
+def make_dataset(n, dim, n_queries, noise, intrinsic_dim=32, seed=0):
+    # Dados sintéticos numa variedade de baixa dimensão (como embeddings reais
+    # de texto), sem clusters bem separados: os vizinhos de uma query caem em
+    # várias listas do IVF, então o recall depende de verdade do nprobe.
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(intrinsic_dim, dim)).astype(np.float32)
+    latent = rng.normal(size=(n + n_queries, intrinsic_dim)).astype(np.float32)
+    data = latent @ basis + noise * rng.normal(size=(n + n_queries, dim)).astype(np.float32)
+    return data[:n], data[n:]
+
+
+def ground_truth(vectors, queries, k, block=8192):
+    # Top-k exato em float32 (similaridade de cosseno), independente do dtype da store
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        scores = queries @ vectors[start : start + block].T
+        ids = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        ids = np.concatenate([best_ids, ids], axis=1)
+        top = np.argsort(-scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return [{str(i) for i in row} for row in best_ids]
+
+
+def recall_at_k(results, truth, k):
+    hits = sum(
+        len({r["id"] for r in result} & expected) for result, expected in zip(results, truth)
+    )
+    return hits / (k * len(truth))
+
+
+def run(n, dim, n_queries, k, dtype, nprobe, batch_size, noise):
+    vectors, queries = make_dataset(n, dim, n_queries, noise)
+    truth = ground_truth(vectors, queries, k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(tmp, dim=dim, dtype=dtype, auto_index_threshold=n + 1, nprobe=nprobe)
+
+        start = time.perf_counter()
+        for i in range(0, n, batch_size):
+            ids = [str(j) for j in range(i, min(i + batch_size, n))]
+            store.add(vectors[i : i + batch_size], ids=ids)
+        insert_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.build_index()
+        index_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exact = store.search(queries, k=k, exact=True)
+        brute_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+        start = time.perf_counter()
+        approx = store.search(queries, k=k)
+        ivf_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+        # Recall sempre contra o top-k exato em float32: no int8 inclui a
+        # perda da quantização, não só a do IVF
+        brute_recall = recall_at_k(exact, truth, k)
+        ivf_recall = recall_at_k(approx, truth, k)
+        store.close()
+
+    print(
+        f"{dtype:8s} n={n} dim={dim} nprobe={nprobe} | "
+        f"insert {n / insert_s:,.0f} vec/s | index {index_s:.1f}s | "
+        f"brute {brute_ms:.2f} ms/q | ivf {ivf_ms:.2f} ms/q "
+        f"({brute_ms / ivf_ms:.1f}x) | recall@{k} brute {brute_recall:.3f} ivf {ivf_recall:.3f}"
+    )
+
+
+if __name__ == "__main__":
+    # Benchmark de recall/latência do índice IVF contra força bruta.
+    # Rodar a partir da raiz do repositório:
+    #   python -m http_api_services.action_services.vkb_manager.benchmark_vkb
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--noise", type=float, default=0.5)
+    args = parser.parse_args()
+
+    for dtype in ("float32", "int8"):
+        for nprobe in args.nprobe:
+            run(args.n, args.dim, args.queries, args.k, dtype, nprobe, args.batch_size, args.noise)
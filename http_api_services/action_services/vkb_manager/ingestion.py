@@ -0,0 +1,277 @@
+import hashlib
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# Evento sentinela para encerrar o dispatcher
+_STOP = object()
+
+
+def _embed_texts(texts):
+    # Import tardio: torch/transformers só carregam quando o primeiro lote é embedado
+    from http_api_services.action_services.vkb_manager.text_embedder import embed_texts
+
+    return embed_texts(texts)
+
+
+class VKBIngestionPipeline:
+    """
+    Mantém a base vetorial em dia com os arquivos escritos pelo
+    LocalFoldersCommManager, sem re-embedar tudo a cada escrita.
+
+    Registrado como hook do manager, recebe os eventos de create/update/delete
+    numa fila limitada (backpressure: quem escreve espera se a fila encher).
+    Um dispatcher junta os eventos em lotes (o evento mais recente de cada
+    arquivo vence), quebra os textos em chunks e só embeda chunks cujo hash
+    de conteúdo mudou. Os embeddings rodam em lotes num pool de threads e os
+    vetores são inseridos/removidos na VectorStore com ids "<arquivo>#<chunk>".
+    Se um lote falhar (ex: erro ao carregar o embedder), seus eventos voltam a
+    ser tentados a cada `retry_delay` segundos, junto com os eventos novos.
+    """
+
+    INDEXED_FILE_TYPES = ("task", "info", "script")
+
+    def __init__(
+        self,
+        store,
+        embed_fn=_embed_texts,
+        chunk_chars: int = 1000,
+        chunk_overlap: int = 100,
+        batch_size: int = 64,
+        embed_batch_size: int = 32,
+        max_wait: float = 0.05,
+        max_pending: int = 1024,
+        workers: int = 2,
+        cache_size: int = 10000,
+        retry_delay: float = 5.0,
+    ):
+        """
+        Args:
+            store (VectorStore): Base onde os chunks são indexados.
+            embed_fn (Callable): Função lista de textos -> matriz de embeddings.
+            chunk_chars (int): Tamanho máximo de cada chunk, em caracteres.
+            chunk_overlap (int): Sobreposição entre chunks consecutivos.
+            batch_size (int): Máximo de eventos processados por lote.
+            embed_batch_size (int): Textos por chamada de embed_fn.
+            max_wait (float): Tempo máximo (s) esperando o lote encher.
+            max_pending (int): Tamanho da fila de eventos (backpressure).
+            workers (int): Threads de embedding.
+            cache_size (int): Embeddings guardados por hash de conteúdo.
+            retry_delay (float): Espera (s) antes de tentar de novo um lote que falhou.
+        """
+        self.store = store
+        self.embed_fn = embed_fn
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.embed_batch_size = embed_batch_size
+        self.max_wait = max_wait
+        self.retry_delay = retry_delay
+        self.last_lag = 0.0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_size = cache_size
+        # Eventos de lotes que falharam, por arquivo (só o dispatcher altera)
+        self._failed: OrderedDict = OrderedDict()
+
+        self._dispatcher = threading.Thread(target=self._run, daemon=True)
+        self._dispatcher.start()
+
+    def on_file_event(self, operation, file_path, file_type, folder_name):
+        """
+        Hook do LocalFoldersCommManager. Bloqueia se a fila estiver cheia.
+        """
+        if file_type not in self.INDEXED_FILE_TYPES:
+            return
+        self._queue.put((operation, Path(file_path), file_type, folder_name, time.monotonic()))
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Espera todos os eventos enfileirados serem indexados.
+
+        Returns:
+            bool: False se o timeout estourar antes ou se algum lote falhou e
+                está aguardando nova tentativa.
+        """
+        # Mesma condição que o Queue.join() usa; task_done() notifica a cada lote
+        with self._queue.all_tasks_done:
+            done = self._queue.all_tasks_done.wait_for(
+                lambda: not self._queue.unfinished_tasks, timeout
+            )
+        return done and not self._failed
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._dispatcher.join()
+        self._executor.shutdown()
+
+    # ------------------------------------------------------------ internals
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.retry_delay if self._failed else None)
+            except queue.Empty:
+                first = None
+            if first is _STOP:
+                self._queue.task_done()
+                return
+
+            # Eventos que falharam entram de novo; eventos novos do mesmo arquivo vencem
+            events = OrderedDict(self._failed)
+            received = 0
+            if first is not None:
+                received = 1
+                events.pop(first[1], None)
+                events[first[1]] = first
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+
+            while len(events) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                received += 1
+                if event is _STOP:
+                    stop = True
+                    break
+                # Evento mais recente do mesmo arquivo substitui o anterior
+                events.pop(event[1], None)
+                events[event[1]] = event
+
+            try:
+                self._process(list(events.values()))
+                self._failed = OrderedDict()
+            except Exception as e:
+                logging.error(
+                    f"Erro na ingestão da base vetorial ({len(events)} arquivos), "
+                    f"nova tentativa em {self.retry_delay}s: {e}"
+                )
+                self._failed = events
+            finally:
+                for _ in range(received):
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+    def _process(self, events):
+        upserts = {}  # id -> (texto, hash, metadados)
+        stale_ids = []
+
+        for operation, file_path, file_type, folder_name, _ in events:
+            text = None
+            if operation != "delete":
+                try:
+                    text = file_path.read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError) as e:
+                    logging.warning(f"Arquivo não indexado {file_path}: {e}")
+
+            chunks = self._chunk(text) if text else []
+            for idx, chunk in enumerate(chunks):
+                upserts[f"{file_path}#{idx}"] = (
+                    chunk,
+                    hashlib.sha1(chunk.encode("utf-8")).hexdigest(),
+                    {
+                        "text": chunk,
+                        "source": str(file_path),
+                        "chunk": idx,
+                        "file_type": file_type,
+                        "folder_name": folder_name,
+                    },
+                )
+            stale_ids.extend(self._existing_ids(file_path, start=len(chunks)))
+
+        # Deduplicação: chunks com o mesmo hash já indexado no mesmo id são pulados
+        ids = list(upserts)
+        existing = self.store.get(ids)
+        changed = [
+            vec_id
+            for vec_id, meta in zip(ids, existing)
+            if meta is None or meta.get("content_hash") != upserts[vec_id][1]
+        ]
+
+        if changed:
+            vectors = self._embed_by_hash({upserts[i][1]: upserts[i][0] for i in changed})
+            self.store.add(
+                np.stack([vectors[upserts[i][1]] for i in changed]),
+                ids=changed,
+                metadatas=[{**upserts[i][2], "content_hash": upserts[i][1]} for i in changed],
+            )
+
+        if stale_ids:
+            self.store.delete(stale_ids)
+
+        self.last_lag = time.monotonic() - min(event[4] for event in events)
+        logging.debug(
+            f"Ingestão: {len(events)} arquivos, {len(changed)} chunks embedados, "
+            f"{len(stale_ids)} removidos, lag {self.last_lag * 1000:.0f} ms"
+        )
+
+    def _embed_by_hash(self, texts_by_hash: dict) -> dict:
+        vectors = {}
+        missing = []
+        for content_hash, text in texts_by_hash.items():
+            if content_hash in self._cache:
+                self._cache.move_to_end(content_hash)
+                vectors[content_hash] = self._cache[content_hash]
+            else:
+                missing.append((content_hash, text))
+
+        # Lotes de embedding distribuídos no pool de threads
+        batches = [
+            missing[start : start + self.embed_batch_size]
+            for start in range(0, len(missing), self.embed_batch_size)
+        ]
+        futures = [
+            self._executor.submit(self.embed_fn, [text for _, text in batch])
+            for batch in batches
+        ]
+        for batch, future in zip(batches, futures):
+            for (content_hash, _), vector in zip(batch, future.result()):
+                vectors[content_hash] = vector
+                self._cache[content_hash] = vector
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+        return vectors
+
+    def _existing_ids(self, file_path: Path, start: int) -> List[str]:
+        # Chunks de um arquivo são contíguos: procura do `start` até o primeiro id ausente
+        ids = []
+        idx = start
+        while self.store.get([f"{file_path}#{idx}"])[0] is not None:
+            ids.append(f"{file_path}#{idx}")
+            idx += 1
+        return ids
+
+    def _chunk(self, text: str) -> List[str]:
+        chunks = []
+        start = 0
+        while start < len(text):
+            end = min(start + self.chunk_chars, len(text))
+            if end < len(text):
+                # Prefere quebrar em fim de linha ou espaço
+                cut = max(text.rfind("\n", start, end), text.rfind(" ", start, end))
+                if cut > start + self.chunk_overlap:
+                    end = cut
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= len(text):
+                break
+            start = max(end - self.chunk_overlap, start + 1)
+        return chunks
@@ -0,0 +1,94 @@
+import os
+import threading
+
+from http_api_services.action_services.vkb_manager.vector_store import VectorStore
+
+
+# Uma única VectorStore por pasta no processo: o serviço de leitura/escrita e
+# o pipeline de ingestão precisam compartilhar o mesmo estado em memória
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(base_path: str = None, dim: int = None, dtype: str = None):
+    base_path = base_path or os.getenv(
+        "VKB_PATH", "./http_api_services/action_services/vkb_manager/vkb_data"
+    )
+    key = os.path.abspath(base_path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = VectorStore(
+                base_path,
+                dim=dim or int(os.getenv("VKB_DIM", 384)),
+                dtype=dtype or os.getenv("VKB_DTYPE", "float32"),
+            )
+        return _stores[key]
+
+
+class VKBManager:
+    def __init__(self, base_path: str = None, dim: int = None, dtype: str = None):
+        self.store = get_vector_store(base_path, dim, dtype)
+
+    def _vectors_from(self, vectors, texts):
+        # Aceita vetores prontos ou textos, que são convertidos em embeddings
+        if vectors is not None:
+            return vectors
+        if texts is not None:
+            # Import tardio: torch/transformers só carregam no primeiro embedding
+            from http_api_services.action_services.vkb_manager.text_embedder import (
+                embed_texts,
+            )
+
+            return embed_texts(texts)
+        raise ValueError("vectors or texts is required")
+
+    def write(
+        self,
+        operation: str = "upsert",
+        vectors=None,
+        texts=None,
+        ids=None,
+        metadatas=None,
+    ):
+        """
+        Operações suportadas:
+          - upsert: insere vetores (ou substitui os de mesmo id)
+          - delete: remove vetores pelo id
+          - build_index: retreina o índice IVF
+
+        vectors: lista de vetores; se None, são gerados a partir de `texts`
+        metadatas: lista de dicts, um por vetor. Se houver `texts` e o metadado
+        não tiver "text", o próprio texto é guardado nele.
+        """
+        if operation == "upsert":
+            vectors = self._vectors_from(vectors, texts)
+            if texts is not None:
+                metadatas = metadatas or [{} for _ in texts]
+                metadatas = [
+                    {"text": text, **meta} for text, meta in zip(texts, metadatas)
+                ]
+            written_ids = self.store.add(vectors, ids=ids, metadatas=metadatas)
+            return {"message": "Vectors written", "ids": written_ids}
+
+        elif operation == "delete":
+            if not ids:
+                raise ValueError("ids is required for delete")
+            deleted = self.store.delete(ids)
+            return {"message": "Vectors deleted", "deleted": deleted}
+
+        elif operation == "build_index":
+            self.store.build_index()
+            return {"message": "Index built", "count": len(self.store)}
+
+        else:
+            raise ValueError("Unsupported operation")
+
+    def read(self, vectors=None, texts=None, k: int = 10, filters=None, exact=False):
+        """
+        Busca em lote os k vizinhos mais próximos de cada consulta.
+
+        filters: ex: {"file_type": ["task", "info"], "folder_name": "ceo"}
+        """
+        queries = self._vectors_from(vectors, texts)
+        results = self.store.search(queries, k=k, filters=filters, exact=exact)
+        return {"message": "ok", "results": results}
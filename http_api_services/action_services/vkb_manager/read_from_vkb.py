@@ -0,0 +1,10 @@
+def read_from_vkb_handler(manager, request):
+    data = request.get_json()
+
+    return manager.read(
+        vectors=data.get("vectors"),
+        texts=data.get("texts"),
+        k=data.get("k", 10),
+        filters=data.get("filters"),
+        exact=data.get("exact", False),
+    )
@@ -0,0 +1,40 @@
+import os
+
+from dotenv import load_dotenv
+
+from http_api_services._http_api_utils.generic_service_initializer import (
+    create_flask_service,
+)
+from http_api_services.action_services.vkb_manager.manager import VKBManager
+from http_api_services.action_services.vkb_manager.read_from_vkb import (
+    read_from_vkb_handler,
+)
+from http_api_services.action_services.vkb_manager.write_to_vkb import (
+    write_to_vkb_handler,
+)
+
+load_dotenv("./http_api_services/action_services/vkb_manager/.env")
+
+
+# `manager_cls` e `routes` também são usados pelo ServiceHost
+manager_cls = VKBManager
+routes = [
+    {
+        "endpoint": "/vkb-write",
+        "methods": ["POST"],
+        "handler": write_to_vkb_handler,
+    },
+    {
+        "endpoint": "/vkb-read",
+        "methods": ["POST"],
+        "handler": read_from_vkb_handler,
+    },
+]
+
+
+if __name__ == "__main__":
+    port = int(os.getenv("PORT", 5001))
+    debug = os.getenv("DEBUG", "0") == "1"
+
+    app = create_flask_service(manager_cls, routes, port=port, debug=debug)
+    app.run(port=port, debug=debug)
@@ -0,0 +1,60 @@
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+
+@lru_cache(maxsize=1)
+def get_embedding_tokenizer():
+    return AutoTokenizer.from_pretrained(
+        EMBEDDING_MODEL, cache_dir="./models/embedding_cache_tokenizer"
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embedding_model():
+    # Carregado uma vez só e reaproveitado entre chamadas
+    return (
+        AutoModel.from_pretrained(
+            EMBEDDING_MODEL, cache_dir="./models/embedding_cache_model"
+        )
+        .to(DEVICE)
+        .eval()
+    )
+
+
+def embed_texts(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """
+    Gera embeddings (mean pooling) para uma lista de textos, em lotes.
+
+    Returns:
+        np.ndarray: Matriz (len(texts), 384) float32.
+    """
+    tokenizer = get_embedding_tokenizer()
+    model = get_embedding_model()
+
+    outputs = []
+    for start in range(0, len(texts), batch_size):
+        batch = tokenizer(
+            texts[start : start + batch_size],
+            padding=True,
+            truncation=True,
+            max_length=256,
+            return_tensors="pt",
+        ).to(DEVICE)
+
+        with torch.inference_mode():
+            hidden = model(**batch).last_hidden_state
+
+        mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        outputs.append(pooled.float().cpu().numpy())
+
+    if not outputs:
+        return np.zeros((0, get_embedding_model().config.hidden_size), dtype=np.float32)
+    return np.concatenate(outputs)
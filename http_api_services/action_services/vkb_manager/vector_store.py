@@ -0,0 +1,583 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Tipos aceitos para os vetores persistidos
+_DTYPES = ("float32", "int8")
+
+
+def _lock_directory(path: Path):
+    """
+    Trava exclusiva (entre processos) do arquivo `path/lock`. Retorna o arquivo
+    aberto, que mantém a trava até ser fechado.
+    """
+    lock_file = open(path / "lock", "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        raise RuntimeError(
+            f"VectorStore at {path} is already open by another process "
+            "(only one writer per VKB_PATH)"
+        )
+    return lock_file
+
+
+class VectorStore:
+    """
+    Base de conhecimento vetorial embarcada.
+
+    Os vetores ficam em arquivos memory-mapped (float32 ou int8 quantizado com
+    escala por vetor), a busca usa similaridade de cosseno e, a partir de
+    `auto_index_threshold` vetores, um índice IVF (k-means + listas invertidas)
+    para busca aproximada. Inserções e buscas são em lote.
+
+    Layout da pasta:
+        config.json   -> dim, dtype, capacidade e quantidade de vetores
+        vectors.dat   -> matriz (capacidade, dim)
+        scales.dat    -> escala por vetor (só int8)
+        assign.dat    -> centroide IVF de cada vetor (-1 se sem índice)
+        centroids.npy -> centroides IVF
+        meta.jsonl    -> log append-only de ids, metadados e deleções
+        lock          -> trava de escrita única
+
+    Só um processo pode abrir uma mesma pasta: o estado fica em memória e os
+    arquivos não têm coordenação entre escritores. Uma segunda abertura (ex:
+    o serviço vkb rodando sozinho e o files-manager com a mesma VKB_PATH)
+    falha com RuntimeError. Dentro do processo, use get_vector_store().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int = 384,
+        dtype: str = "float32",
+        auto_index_threshold: int = 20000,
+        nprobe: int = 8,
+        brute_force_limit: int = 50000,
+        compact_ratio: float = 0.3,
+        compact_min_rows: int = 1024,
+    ):
+        """
+        Args:
+            path (str): Pasta onde a base é persistida (criada se não existir).
+            dim (int): Dimensão dos vetores (ignorado se a base já existir).
+            dtype (str): "float32" ou "int8" (ignorado se a base já existir).
+            auto_index_threshold (int): Quantidade de vetores a partir da qual o
+                índice IVF é treinado automaticamente.
+            nprobe (int): Quantidade de listas IVF visitadas por busca.
+            brute_force_limit (int): Com filtros, se o número de vetores que
+                passam no filtro for menor que isso, a busca é exata.
+            compact_ratio (float): Fração de linhas deletadas a partir da qual
+                add()/delete() compactam os arquivos automaticamente.
+            compact_min_rows (int): Abaixo dessa quantidade de linhas não compacta.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock_file = _lock_directory(self.path)
+        self.auto_index_threshold = auto_index_threshold
+        self.nprobe = nprobe
+        self.brute_force_limit = brute_force_limit
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+        self._lock = threading.RLock()
+
+        config_path = self.path / "config.json"
+        if config_path.exists():
+            config = json.loads(config_path.read_text(encoding="utf-8"))
+        else:
+            if dtype not in _DTYPES:
+                raise ValueError(f"Unsupported dtype: {dtype}")
+            config = {"dim": dim, "dtype": dtype, "count": 0, "capacity": 1024}
+
+        self.dim = config["dim"]
+        self.dtype = config["dtype"]
+        self.count = config["count"]
+        self._capacity = config["capacity"]
+        # Contador dos ids gerados: nunca volta, nem depois de compact()
+        self._next_id = config.get("next_id", self.count)
+
+        self._open_matrices()
+
+        self._centroids = None
+        centroids_path = self.path / "centroids.npy"
+        if centroids_path.exists():
+            self._centroids = np.load(centroids_path)
+
+        # Estado em memória reconstruído a partir do meta.jsonl
+        self._ids: List[Optional[str]] = [None] * self.count
+        self._metadata: List[dict] = [{} for _ in range(self.count)]
+        self._row_by_id: Dict[str, int] = {}
+        self._deleted = np.zeros(self._capacity, dtype=bool)
+        self._meta_index: Dict[tuple, List[int]] = {}
+        self._replay_meta_log()
+
+        self._lists: List[List[np.ndarray]] = []
+        self._rebuild_inverted_lists()
+
+        self._save_config()
+
+    # ------------------------------------------------------------------ API
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    def add(
+        self,
+        vectors,
+        ids: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[dict]] = None,
+    ) -> List[str]:
+        """
+        Insere (ou substitui, se o id já existir) um lote de vetores. Ids
+        repetidos dentro do mesmo lote são deduplicados (o último vence).
+
+        Args:
+            vectors: Matriz (n, dim) ou lista de listas.
+            ids (Optional[Sequence[str]]): Ids dos vetores. Gerados se None.
+            metadatas (Optional[Sequence[dict]]): Metadados de cada vetor.
+
+        Returns:
+            List[str]: Ids dos vetores inseridos.
+        """
+        vectors = self._normalize(vectors)
+        n = len(vectors)
+        if metadatas is not None and len(metadatas) != n:
+            raise ValueError("metadatas must have the same length as vectors")
+        if ids is not None and len(ids) != n:
+            raise ValueError("ids must have the same length as vectors")
+
+        with self._lock:
+            if ids is None:
+                ids = self._generate_ids(n)
+            ids = [str(i) for i in ids]
+            metadatas = metadatas or [{} for _ in range(n)]
+
+            if len(set(ids)) != n:
+                last = sorted({vec_id: i for i, vec_id in enumerate(ids)}.values())
+                vectors = vectors[last]
+                ids = [ids[i] for i in last]
+                metadatas = [metadatas[i] for i in last]
+                n = len(last)
+
+            # Upsert: vetores com id já existente são marcados como deletados
+            self._delete_rows([self._row_by_id[i] for i in ids if i in self._row_by_id])
+
+            self._ensure_capacity(self.count + n)
+            start = self.count
+            rows = np.arange(start, start + n)
+
+            if self.dtype == "int8":
+                scales = np.abs(vectors).max(axis=1)
+                scales[scales == 0] = 1.0
+                self._vectors[rows] = np.round(vectors / scales[:, None] * 127).astype(np.int8)
+                self._scales[rows] = scales / 127
+            else:
+                self._vectors[rows] = vectors
+
+            if self._centroids is not None:
+                assign = self._nearest_centroids(vectors)
+                self._assign[rows] = assign
+                for c in np.unique(assign):
+                    self._lists[c].append(rows[assign == c])
+            else:
+                self._assign[rows] = -1
+
+            records = []
+            for row, vec_id, meta in zip(rows.tolist(), ids, metadatas):
+                self._ids.append(vec_id)
+                self._metadata.append(dict(meta))
+                self._row_by_id[vec_id] = row
+                self._index_metadata(row, meta)
+                records.append({"row": row, "id": vec_id, "metadata": meta})
+
+            self.count += n
+            self._append_meta_log(records)
+            self._flush()
+
+            if self._centroids is None and len(self) >= self.auto_index_threshold:
+                self.build_index()
+
+            self._maybe_compact()
+            return ids
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        Remove vetores pelo id.
+
+        Returns:
+            int: Quantidade de vetores removidos.
+        """
+        with self._lock:
+            rows = [self._row_by_id[str(i)] for i in ids if str(i) in self._row_by_id]
+            self._delete_rows(rows)
+            self._maybe_compact()
+            return len(rows)
+
+    def get(self, ids: Iterable[str]) -> List[Optional[dict]]:
+        """
+        Retorna os metadados de cada id (None se o id não existir).
+        """
+        with self._lock:
+            rows = [self._row_by_id.get(str(i)) for i in ids]
+            return [None if row is None else self._metadata[row] for row in rows]
+
+    def search(
+        self,
+        queries,
+        k: int = 10,
+        filters: Optional[dict] = None,
+        exact: bool = False,
+    ) -> List[List[dict]]:
+        """
+        Busca em lote os k vizinhos mais próximos (similaridade de cosseno).
+
+        Args:
+            queries: Matriz (m, dim) ou lista de listas.
+            k (int): Quantidade de resultados por consulta.
+            filters (Optional[dict]): Filtro por metadados. Cada chave aceita um
+                valor ou uma lista de valores aceitos, ex: {"tipo": ["task", "info"]}.
+            exact (bool): Se True, ignora o índice IVF e faz força bruta.
+
+        Returns:
+            List[List[dict]]: Para cada consulta, lista de
+                {"id", "score", "metadata"} em ordem decrescente de score.
+        """
+        queries = self._normalize(queries)
+
+        with self._lock:
+            alive = ~self._deleted[: self.count]
+            if filters:
+                alive &= self._filter_mask(filters)
+
+            # Sem índice, busca exata pedida ou filtro seletivo: força bruta sobre
+            # as linhas permitidas é exata e barata
+            if (
+                exact
+                or self._centroids is None
+                or (filters and np.count_nonzero(alive) <= self.brute_force_limit)
+            ):
+                rows = np.flatnonzero(alive)
+                scores = self._scores(rows, queries)
+                return [self._top_k(rows, s, k) for s in scores]
+
+            probes = self._probe(queries)
+            results = []
+            for q, probe in zip(queries, probes):
+                candidates = np.concatenate([self._get_list(c) for c in probe])
+                candidates = candidates[alive[candidates]]
+                scores = self._scores(candidates, q[None, :])[0]
+                results.append(self._top_k(candidates, scores, k))
+            return results
+
+    def build_index(self, nlist: Optional[int] = None, iterations: int = 10) -> None:
+        """
+        (Re)treina o índice IVF com k-means sobre os vetores atuais.
+
+        Args:
+            nlist (Optional[int]): Quantidade de centroides. Padrão: 4 * sqrt(n).
+            iterations (int): Iterações do k-means.
+        """
+        with self._lock:
+            rows = np.flatnonzero(~self._deleted[: self.count])
+            if len(rows) == 0:
+                return
+            nlist = nlist or max(1, int(4 * np.sqrt(len(rows))))
+            nlist = min(nlist, len(rows))
+
+            # Treina sobre uma amostra para manter o custo limitado
+            rng = np.random.default_rng(0)
+            sample_size = min(len(rows), nlist * 64)
+            sample = self._dense(rng.choice(rows, sample_size, replace=False))
+
+            centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, sample)
+                counts = np.bincount(assign, minlength=nlist)
+                non_empty = counts > 0
+                centroids[non_empty] = sums[non_empty]
+                centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+            self._centroids = centroids.astype(np.float32)
+            np.save(self.path / "centroids.npy", self._centroids)
+
+            # Atribui todos os vetores em blocos para não estourar a memória
+            self._assign[: self.count] = -1
+            for start in range(0, len(rows), 65536):
+                block = rows[start : start + 65536]
+                self._assign[block] = self._nearest_centroids(self._dense(block))
+
+            self._rebuild_inverted_lists()
+            self._flush()
+            logging.info(f"Índice IVF treinado com {nlist} listas para {len(rows)} vetores.")
+
+    def close(self) -> None:
+        """Grava o que estiver pendente e libera a trava da pasta."""
+        with self._lock:
+            if self._lock_file is None:
+                return
+            self._flush()
+            self._vectors = self._scales = self._assign = None
+            self._lock_file.close()
+            self._lock_file = None
+
+    def compact(self) -> None:
+        """
+        Reescreve os arquivos só com as linhas vivas, descartando vetores
+        deletados/substituídos e os registros de deleção do meta.jsonl.
+        O índice IVF é mantido (centroides iguais, atribuições copiadas).
+        """
+        with self._lock:
+            live = np.flatnonzero(~self._deleted[: self.count])
+            live = live[[self._row_by_id.get(self._ids[row]) == row for row in live]]
+            n = len(live)
+            capacity = 1024
+            while capacity < n:
+                capacity *= 2
+
+            # Escreve tudo em arquivos .tmp e só depois substitui os originais
+            names = ["vectors.dat", "assign.dat"] + (["scales.dat"] if self.dtype == "int8" else [])
+            new_vectors = self._open_memmap("vectors.dat.tmp", self.dtype, (capacity, self.dim))
+            new_assign = self._open_memmap("assign.dat.tmp", "int32", (capacity,))
+            new_scales = (
+                self._open_memmap("scales.dat.tmp", "float32", (capacity,))
+                if self.dtype == "int8"
+                else None
+            )
+            for start in range(0, n, 65536):
+                block = live[start : start + 65536]
+                new_vectors[start : start + len(block)] = self._vectors[block]
+                new_assign[start : start + len(block)] = self._assign[block]
+                if new_scales is not None:
+                    new_scales[start : start + len(block)] = self._scales[block]
+            for matrix in (new_vectors, new_assign, new_scales):
+                if matrix is not None:
+                    matrix.flush()
+            del new_vectors, new_assign, new_scales
+
+            ids = [self._ids[row] for row in live]
+            metadata = [self._metadata[row] for row in live]
+            with open(self.path / "meta.jsonl.tmp", "w", encoding="utf-8") as f:
+                for row, (vec_id, meta) in enumerate(zip(ids, metadata)):
+                    f.write(json.dumps({"row": row, "id": vec_id, "metadata": meta}) + "\n")
+
+            # Solta os mapeamentos antigos antes de substituir os arquivos
+            self._vectors = self._scales = self._assign = None
+            for name in names + ["meta.jsonl"]:
+                os.replace(self.path / f"{name}.tmp", self.path / name)
+
+            self.count = n
+            self._capacity = capacity
+            self._open_matrices()
+            self._ids = ids
+            self._metadata = metadata
+            self._row_by_id = {vec_id: row for row, vec_id in enumerate(ids)}
+            self._deleted = np.zeros(capacity, dtype=bool)
+            self._meta_index = {}
+            for row, meta in enumerate(metadata):
+                self._index_metadata(row, meta)
+            self._rebuild_inverted_lists()
+            self._save_config()
+            logging.info(f"VectorStore compactada: {n} vetores vivos.")
+
+    # ------------------------------------------------------------ internals
+
+    def _generate_ids(self, n: int) -> List[str]:
+        ids = []
+        while len(ids) < n:
+            vec_id = str(self._next_id)
+            self._next_id += 1
+            # Pula ids numéricos que já foram passados explicitamente
+            if vec_id not in self._row_by_id:
+                ids.append(vec_id)
+        return ids
+
+    def _maybe_compact(self) -> None:
+        n_deleted = self.count - len(self)
+        if self.count >= self.compact_min_rows and n_deleted > self.compact_ratio * self.count:
+            self.compact()
+
+    def _normalize(self, vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dim {self.dim}, got {vectors.shape[1]}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _dense(self, rows: np.ndarray) -> np.ndarray:
+        # Vetores das linhas em float32 (desquantiza se int8)
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self.dtype == "int8":
+            vectors *= self._scales[rows][:, None]
+        return vectors
+
+    def _scores(self, rows: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        if len(rows) == 0:
+            return np.zeros((len(queries), 0), dtype=np.float32)
+        if self.dtype == "int8":
+            # Escala aplicada depois do produto para evitar desquantizar a matriz
+            raw = queries @ np.asarray(self._vectors[rows], dtype=np.float32).T
+            return raw * self._scales[rows][None, :]
+        return queries @ self._vectors[rows].T
+
+    def _top_k(self, rows: np.ndarray, scores: np.ndarray, k: int) -> List[dict]:
+        if len(rows) == 0:
+            return []
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "id": self._ids[rows[i]],
+                "score": float(scores[i]),
+                "metadata": self._metadata[rows[i]],
+            }
+            for i in top
+        ]
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _probe(self, queries: np.ndarray) -> np.ndarray:
+        nprobe = min(self.nprobe, len(self._centroids))
+        scores = queries @ self._centroids.T
+        return np.argpartition(-scores, nprobe - 1, axis=1)[:, :nprobe]
+
+    def _get_list(self, c: int) -> np.ndarray:
+        # Consolida os pedaços adicionados desde a última consulta
+        chunks = self._lists[c]
+        if len(chunks) > 1:
+            self._lists[c] = [np.concatenate(chunks)]
+        return self._lists[c][0] if self._lists[c] else np.empty(0, dtype=np.int64)
+
+    def _rebuild_inverted_lists(self) -> None:
+        if self._centroids is None:
+            self._lists = []
+            return
+        assign = np.asarray(self._assign[: self.count])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+        self._lists = [
+            [order[bounds[c] : bounds[c + 1]]] for c in range(len(self._centroids))
+        ]
+
+    def _filter_mask(self, filters: dict) -> np.ndarray:
+        mask = np.ones(self.count, dtype=bool)
+        for key, accepted in filters.items():
+            if not isinstance(accepted, (list, tuple, set)):
+                accepted = [accepted]
+            key_mask = np.zeros(self.count, dtype=bool)
+            for value in accepted:
+                rows = self._meta_index.get((key, value))
+                if rows:
+                    key_mask[rows] = True
+            mask &= key_mask
+        return mask
+
+    def _index_metadata(self, row: int, meta: dict) -> None:
+        # Só valores escalares entram no índice de filtros
+        for key, value in meta.items():
+            if isinstance(value, (str, int, float, bool)) or value is None:
+                self._meta_index.setdefault((key, value), []).append(row)
+
+    def _delete_rows(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        for row in rows:
+            self._deleted[row] = True
+            vec_id = self._ids[row]
+            if self._row_by_id.get(vec_id) == row:
+                del self._row_by_id[vec_id]
+        self._append_meta_log([{"row": row, "deleted": True} for row in rows])
+
+    def _replay_meta_log(self) -> None:
+        meta_path = self.path / "meta.jsonl"
+        if not meta_path.exists():
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                row = record["row"]
+                if row >= self.count:
+                    # Linha gravada no log mas não confirmada no config (queda no meio do add)
+                    continue
+                if record.get("deleted"):
+                    self._deleted[row] = True
+                    if self._row_by_id.get(self._ids[row]) == row:
+                        del self._row_by_id[self._ids[row]]
+                    continue
+                self._ids[row] = record["id"]
+                self._metadata[row] = record["metadata"]
+                self._row_by_id[record["id"]] = row
+                self._index_metadata(row, record["metadata"])
+
+    def _append_meta_log(self, records: List[dict]) -> None:
+        with open(self.path / "meta.jsonl", "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def _open_matrices(self) -> None:
+        self._vectors = self._open_memmap("vectors.dat", self.dtype, (self._capacity, self.dim))
+        self._scales = (
+            self._open_memmap("scales.dat", "float32", (self._capacity,))
+            if self.dtype == "int8"
+            else None
+        )
+        self._assign = self._open_memmap("assign.dat", "int32", (self._capacity,))
+
+    def _open_memmap(self, name: str, dtype: str, shape: tuple) -> np.memmap:
+        file_path = self.path / name
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        # Cria ou estende o arquivo antes de mapear
+        with open(file_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(file_path, dtype=dtype, mode="r+", shape=shape)
+
+    def _ensure_capacity(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+        new_capacity = self._capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        self._flush()
+        self._capacity = new_capacity
+        self._open_matrices()
+        deleted = np.zeros(new_capacity, dtype=bool)
+        deleted[: len(self._deleted)] = self._deleted
+        self._deleted = deleted
+
+    def _flush(self) -> None:
+        self._vectors.flush()
+        if self._scales is not None:
+            self._scales.flush()
+        self._assign.flush()
+        self._save_config()
+
+    def _save_config(self) -> None:
+        config = {
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "count": self.count,
+            "capacity": self._capacity,
+            "next_id": self._next_id,
+        }
+        (self.path / "config.json").write_text(json.dumps(config), encoding="utf-8")
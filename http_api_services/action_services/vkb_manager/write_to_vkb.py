@@ -0,0 +1,10 @@
+def write_to_vkb_handler(manager, request):
+    data = request.get_json()
+
+    return manager.write(
+        operation=data.get("operation", "upsert"),
+        vectors=data.get("vectors"),
+        texts=data.get("texts"),
+        ids=data.get("ids"),
+        metadatas=data.get("metadatas"),
+    )
@@ -0,0 +1,102 @@
+import json
+import logging
+from typing import Iterable, Iterator, List
+
+
+class IncrementalCommandParser:
+    """
+    Parser incremental de comandos JSON vindos de um stream de tokens.
+
+    Cada objeto JSON de nível superior é emitido assim que sua chave de
+    fechamento chega, sem esperar o fim da geração. Texto fora de objetos
+    (ex: explicações do modelo) é ignorado.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[dict]:
+        """
+        Consome um pedaço de texto e retorna os comandos completos encontrados.
+
+        Args:
+            text (str): Trecho (token ou chunk) gerado pelo modelo.
+
+        Returns:
+            List[dict]: Comandos fechados neste trecho, na ordem em que apareceram.
+        """
+        commands = []
+
+        for char in text:
+            if self._depth == 0:
+                # Fora de um objeto: só nos interessa o início de um novo comando
+                if char == "{":
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    command = self._decode("".join(self._buffer))
+                    if command is not None:
+                        commands.append(command)
+                    self._buffer = []
+
+        return commands
+
+    def close(self) -> None:
+        """
+        Finaliza o parser. Um comando ainda aberto no fim do stream é descartado.
+        """
+        if self._depth > 0:
+            logging.warning("Stream terminou com um comando incompleto, descartado.")
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @staticmethod
+    def _decode(raw: str):
+        try:
+            command = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logging.warning(f"Comando inválido ignorado: {e}")
+            return None
+        return command if isinstance(command, dict) else None
+
+
+def iter_commands(token_stream: Iterable[str]) -> Iterator[dict]:
+    """
+    Gera cada comando completo de um stream de tokens assim que ele é fechado.
+
+    Args:
+        token_stream (Iterable[str]): Tokens/chunks de texto gerados pelo modelo.
+
+    Yields:
+        dict: Comando JSON decodificado.
+    """
+    parser = IncrementalCommandParser()
+    try:
+        for token in token_stream:
+            yield from parser.feed(token)
+    finally:
+        parser.close()
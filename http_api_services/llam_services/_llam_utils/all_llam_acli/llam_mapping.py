@@ -1,4 +1,34 @@
+from typing import Iterator
+
 import llam_acli.inference_services.vision_qa.blip_model_run as blip_model_run
+from http_api_services.llam_services._llam_utils.context.incremental_context_builder import (
+    IncrementalContextBuilder,
+)
+
+# Um builder por combinação de pastas, reaproveitado entre chamadas para que
+# só os arquivos alterados sejam relidos
+_context_builders: dict[tuple, IncrementalContextBuilder] = {}
+
+
+def get_context(**kwargs) -> str:
+    """
+    Monta o contexto das pastas `llam_comm_folder` e `database` (esta última
+    ignorada se `llam_comm_only=True`), limitado a `context_tokens` tokens.
+    """
+    folders = [kwargs["llam_comm_folder"]] if kwargs.get("llam_comm_folder") else []
+    if kwargs.get("database") and not kwargs.get("llam_comm_only", False):
+        folders.append(kwargs["database"])
+    if not folders:
+        return ""
+
+    key = tuple(folders)
+    if key not in _context_builders:
+        _context_builders[key] = IncrementalContextBuilder(folders)
+
+    return _context_builders[key].build(
+        query=kwargs.get("system_prompt"),
+        token_budget=kwargs.get("context_tokens", 2048),
+    )
 
 
 def run_inference(
@@ -10,18 +40,51 @@ def run_inference(
     if llm_model == "vision_qa":
 
         img_info = blip_model_run.get_info_from_image(
-            kwargs["image"], kwargs["question"]
+            kwargs["image"], kwargs["question"], roi=kwargs.get("roi")
         )
 
         return img_info
 
     elif llm_model == "tech_lead":
+        context = get_context(**kwargs)  # noqa: F841
+        ...
+        # open source with prompt engineering
+    elif llm_model == "programmer":
+        context = get_context(**kwargs)  # noqa: F841
+        ...
+        # open source with prompt engineering
+    elif llm_model == "human":
+        ...
+    elif llm_model == "ceo":
+        context = get_context(**kwargs)  # noqa: F841
+        ...
+
+
+def run_inference_stream(
+    llm_model: str = ("vision_qa", "tech_lead", "swe", "automated_human", "ceo"),
+    **kwargs
+) -> Iterator[str]:
+    """
+    Igual a run_inference, mas gera os tokens conforme o modelo os produz.
+    Use com command_stream_parser.iter_commands para despachar cada comando
+    assim que ele for fechado, sem esperar a resposta inteira.
+    """
+
+    if llm_model == "vision_qa":
+        yield from blip_model_run.stream_info_from_image(
+            kwargs["image"], kwargs["question"], roi=kwargs.get("roi")
+        )
+
+    elif llm_model == "tech_lead":
+        context = get_context(**kwargs)  # noqa: F841
         ...
         # open source with prompt engineering
     elif llm_model == "programmer":
+        context = get_context(**kwargs)  # noqa: F841
         ...
         # open source with prompt engineering
     elif llm_model == "human":
         ...
     elif llm_model == "ceo":
+        context = get_context(**kwargs)  # noqa: F841
         ...
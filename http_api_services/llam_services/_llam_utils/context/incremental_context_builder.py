@@ -0,0 +1,287 @@
+import bisect
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Tokenizador padrão: aproximação barata (palavras e pontuação).
+# Pode ser trocado pelo tokenizer real do modelo via parâmetro `token_spans`.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Extensões binárias que nunca entram no contexto
+_BINARY_EXTS = {".jpeg", ".jpg", ".png", ".gif", ".bmp", ".npy", ".bin", ".safetensors"}
+# Gravações de tela do FrameArchive: dados dos tiles e índice JSON lines
+_BINARY_EXTS |= {".frames", ".idx"}
+
+# Marca "ranking ainda não calculado" (diferente de qualquer conjunto de termos)
+_NO_QUERY = object()
+
+
+def default_token_spans(text: str) -> List[Tuple[int, int]]:
+    """Retorna os (início, fim) de cada token no texto."""
+    return [match.span() for match in _TOKEN_RE.finditer(text)]
+
+
+@dataclass
+class _Chunk:
+    text: str
+    n_tokens: int
+    terms: frozenset
+
+
+@dataclass
+class _CachedFile:
+    mtime_ns: int
+    size: int
+    digest: str
+    priority: int
+    chunks: List[_Chunk] = field(default_factory=list)
+    # Arquivo ilegível (binário/encoding): fica em cache sem chunks até o
+    # mtime/tamanho mudar, para não ser relido a cada build()
+    skipped: bool = False
+
+
+class IncrementalContextBuilder:
+    """
+    Monta o contexto das LLAMs a partir das pastas `database` e `llam_comm`
+    relendo apenas os arquivos que mudaram desde a última chamada.
+
+    Cada arquivo fica em memória já quebrado em chunks pré-tokenizados. A cada
+    build() só é feito um stat por arquivo; conteúdo é lido (e re-tokenizado)
+    apenas quando mtime/tamanho mudam e o hash do conteúdo também. O ranking
+    dos chunks também fica em cache: enquanto a query for a mesma, só as
+    entradas dos arquivos alterados são removidas/reinseridas.
+    """
+
+    def __init__(
+        self,
+        folders: Sequence[str],
+        token_spans: Callable[[str], List[Tuple[int, int]]] = default_token_spans,
+        chunk_tokens: int = 256,
+    ):
+        """
+        Args:
+            folders (Sequence[str]): Pastas lidas, em ordem de prioridade
+                (a primeira tem prioridade maior no ranking).
+            token_spans (Callable): Função texto -> lista de (início, fim) de
+                cada token. Os chunks são cortados nesses offsets do texto
+                original, preservando espaços e quebras de linha.
+            chunk_tokens (int): Tamanho máximo de cada chunk, em tokens.
+        """
+        self.folders = [Path(f) for f in folders]
+        self.token_spans = token_spans
+        self.chunk_tokens = chunk_tokens
+        self._files: Dict[Path, _CachedFile] = {}
+
+        # Ranking em cache: lista ordenada de chaves e as chaves de cada arquivo
+        self._ranked: List[tuple] = []
+        self._rank_keys: Dict[Path, List[tuple]] = {}
+        self._rank_query = _NO_QUERY
+        self._dirty = set()
+
+    def refresh(self) -> int:
+        """
+        Sincroniza o cache com o disco.
+
+        Returns:
+            int: Quantidade de arquivos re-tokenizados nesta chamada.
+        """
+        seen = set()
+        reloaded = 0
+
+        for priority, folder in enumerate(self.folders):
+            if not folder.exists():
+                continue
+            for root, _, files in os.walk(folder):
+                for name in files:
+                    path = Path(root) / name
+                    if path.suffix.lower() in _BINARY_EXTS:
+                        continue
+                    seen.add(path)
+                    if self._refresh_file(path, priority):
+                        reloaded += 1
+
+        # Remove do cache arquivos que foram apagados
+        for path in list(self._files):
+            if path not in seen:
+                del self._files[path]
+                self._dirty.add(path)
+
+        return reloaded
+
+    def build(self, query: Optional[str] = None, token_budget: int = 2048) -> str:
+        """
+        Monta o prompt de contexto respeitando o orçamento de tokens.
+
+        Ranking dos chunks:
+          1. sobreposição de termos com `query` (se fornecida);
+          2. prioridade da pasta (ordem em `folders`);
+          3. arquivos modificados mais recentemente primeiro.
+        Chunks entram em ordem de ranking até o orçamento acabar; o último
+        chunk que não cabe inteiro é truncado no limite.
+
+        Args:
+            query (Optional[str]): Texto usado para priorizar chunks relevantes.
+            token_budget (int): Máximo de tokens do contexto gerado.
+
+        Returns:
+            str: Contexto formatado, agrupado por arquivo.
+        """
+        self.refresh()
+
+        query_terms = frozenset(self._terms(query)) if query else frozenset()
+        self._update_ranking(query_terms)
+
+        selected = {}
+        remaining = token_budget
+        for *_, path_str, idx in self._ranked:
+            if remaining <= 0:
+                break
+            chunk = self._files[Path(path_str)].chunks[idx]
+            if chunk.n_tokens <= remaining:
+                text = chunk.text
+                remaining -= chunk.n_tokens
+            else:
+                # Corta no fim do último token que cabe, mantendo a formatação
+                text = chunk.text[: self.token_spans(chunk.text)[remaining - 1][1]]
+                remaining = 0
+            selected[(path_str, idx)] = text
+
+        # Reagrupa na ordem original dos arquivos para manter a leitura coerente
+        sections = []
+        current_path = None
+        for path_str, idx in sorted(selected):
+            if path_str != current_path:
+                current_path = path_str
+                sections.append(f"### {path_str}")
+            sections.append(selected[(path_str, idx)])
+
+        return "\n".join(sections)
+
+    def _terms(self, text: str):
+        return (text[start:end].lower() for start, end in self.token_spans(text))
+
+    def _file_rank_keys(self, path: Path, query_terms: frozenset) -> List[tuple]:
+        cached = self._files[path]
+        return [
+            (
+                -len(query_terms & chunk.terms) if query_terms else 0,
+                cached.priority,
+                -cached.mtime_ns,
+                str(path),
+                idx,
+            )
+            for idx, chunk in enumerate(cached.chunks)
+        ]
+
+    def _update_ranking(self, query_terms: frozenset) -> None:
+        if query_terms != self._rank_query:
+            # Query nova: o score de todos os chunks muda, ranking refeito do zero
+            self._rank_query = query_terms
+            self._rank_keys = {
+                path: self._file_rank_keys(path, query_terms) for path in self._files
+            }
+            self._ranked = sorted(key for keys in self._rank_keys.values() for key in keys)
+            self._dirty.clear()
+            return
+
+        # Mesma query: só os arquivos alterados saem e voltam para o ranking
+        for path in self._dirty:
+            for key in self._rank_keys.pop(path, []):
+                del self._ranked[bisect.bisect_left(self._ranked, key)]
+            if path in self._files:
+                keys = self._file_rank_keys(path, query_terms)
+                self._rank_keys[path] = keys
+                for key in keys:
+                    bisect.insort(self._ranked, key)
+        self._dirty.clear()
+
+    def _refresh_file(self, path: Path, priority: int) -> bool:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+
+        cached = self._files.get(path)
+        if (
+            cached is not None
+            and cached.mtime_ns == stat.st_mtime_ns
+            and cached.size == stat.st_size
+        ):
+            if cached.priority != priority:
+                cached.priority = priority
+                self._dirty.add(path)
+            return False
+
+        try:
+            raw = path.read_bytes()
+            text = raw.decode("utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            logging.warning(f"Arquivo ignorado no contexto {path}: {e}")
+            if cached is not None and cached.chunks:
+                self._dirty.add(path)
+            self._files[path] = _CachedFile(
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                digest="",
+                priority=priority,
+                skipped=True,
+            )
+            return False
+
+        # mtime mudou: no mínimo a posição no ranking (recência) muda
+        self._dirty.add(path)
+
+        digest = hashlib.sha1(raw).hexdigest()
+        if cached is not None and cached.digest == digest:
+            # Só o mtime mudou (ex: touch), o conteúdo é o mesmo
+            cached.mtime_ns = stat.st_mtime_ns
+            cached.size = stat.st_size
+            cached.priority = priority
+            return False
+
+        self._files[path] = _CachedFile(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=digest,
+            priority=priority,
+            chunks=self._chunk(text),
+        )
+        return True
+
+    def _make_chunk(self, text: str, spans: List[Tuple[int, int]]) -> _Chunk:
+        return _Chunk(
+            text=text,
+            n_tokens=len(spans),
+            terms=frozenset(text[start:end].lower() for start, end in spans),
+        )
+
+    def _chunk(self, text: str) -> List[_Chunk]:
+        # Quebra por parágrafos, juntando até chunk_tokens tokens por chunk.
+        # Sempre corta o texto original nos offsets dos tokens, nunca re-junta tokens.
+        chunks = []
+        spans = self.token_spans(text)
+        size = self.chunk_tokens
+
+        # Índices (ordenados) dos tokens onde começa cada parágrafo
+        paragraph_starts = sorted(
+            {bisect.bisect_left(spans, (m.end(), -1)) for m in re.finditer(r"\n\s*\n", text)}
+        )
+
+        start = 0
+        while start < len(spans):
+            end = min(start + size, len(spans))
+            if end < len(spans):
+                # Prefere terminar no último limite de parágrafo dentro da janela
+                i = bisect.bisect_right(paragraph_starts, end) - 1
+                if i >= 0 and paragraph_starts[i] > start:
+                    end = paragraph_starts[i]
+            offset = spans[start][0]
+            chunk_spans = [(s - offset, e - offset) for s, e in spans[start:end]]
+            chunks.append(self._make_chunk(text[offset : spans[end - 1][1]], chunk_spans))
+            start = end
+
+        return chunks
@@ -1,6 +1,9 @@
+from functools import lru_cache
+
 from transformers import BlipForQuestionAnswering, BlipProcessor
 
 
+@lru_cache(maxsize=1)
 def get_blip_processor():
 
     # Carrega o processador (tokenizer e processador de imagem)
@@ -9,8 +12,10 @@ def get_blip_processor():
     )
 
 
+@lru_cache(maxsize=1)
 def get_blip_model():
     # Carrega o modelo já na GPU (se disponível)
+    # lru_cache: o modelo é carregado uma vez só, e não a cada pergunta
     return BlipForQuestionAnswering.from_pretrained(
         "Salesforce/blip-vqa-base", cache_dir="./models/blip_cache_model"
     ).to("cuda")
@@ -1,21 +1,106 @@
+import logging
+import time
+from functools import lru_cache
+from threading import Lock, Thread
+
 from torch import autocast
+from transformers import TextIteratorStreamer
 
 from models.blip_model_config import get_blip_model, get_blip_processor
+from vision_qa.image_preprocessing import BlipPreprocessor, PipelineStats
+
+# Tempo máximo (s) esperando o próximo token no streaming
+STREAM_TIMEOUT = 120
+
+# Um generate por vez no modelo; o pré-processamento roda fora do lock
+_model_lock = Lock()
+_pipeline_stats = PipelineStats()
 
 # usar no get image from remote window:
 # Image.open(response.raw).convert("RGB")
 
 
-def get_info_from_image(img_pil, question: str):
+@lru_cache(maxsize=1)
+def get_blip_preprocessor():
+    return BlipPreprocessor(get_blip_processor())
 
-    processor = get_blip_processor()
 
-    # Prepara a entrada para o modelo
-    inputs = processor(img_pil, question, return_tensors="pt").to("cuda")
+def _to_device(inputs):
+    # Tensores já vêm em memória pinned, então a cópia para a GPU é assíncrona
+    return {key: value.to("cuda", non_blocking=True) for key, value in inputs.items()}
+
 
+def _generate_answer(inputs):
     with autocast(device_type="cuda"):
-        out = get_blip_model().generate(**inputs)
+        out = get_blip_model().generate(**_to_device(inputs))
 
     # Decodifica a resposta
-    answer = processor.decode(out[0], skip_special_tokens=True)
+    return get_blip_processor().decode(out[0], skip_special_tokens=True)
+
+
+def get_pipeline_stats() -> dict:
+    """Tempos de pré-processamento vs. modelo e ganho do pipeline (ver PipelineStats)."""
+    return _pipeline_stats.as_dict()
+
+
+def get_info_from_image(img_pil, question: str, roi=None):
+    """
+    Responde uma pergunta sobre a imagem.
+
+    O pré-processamento (recorte da ROI + redução + tensores) roda no pool do
+    BlipPreprocessor, fora do lock do modelo: com pedidos concorrentes, o
+    preprocess do próximo pedido sobrepõe o generate do atual (double buffering).
+    """
+    _pipeline_stats.start()
+    prep_time = model_time = 0.0
+    try:
+        inputs, prep_time = get_blip_preprocessor().submit(img_pil, question, roi).result()
+
+        with _model_lock:
+            model_start = time.perf_counter()
+            answer = _generate_answer(inputs)
+            model_time = time.perf_counter() - model_start
+    finally:
+        _pipeline_stats.finish(prep_time, model_time)
+
+    logging.debug(
+        f"vision_qa: preprocess {prep_time * 1000:.0f} ms, modelo {model_time * 1000:.0f} ms"
+    )
     return answer
+
+
+def stream_info_from_image(img_pil, question: str, roi=None):
+    """
+    Versão em streaming de get_info_from_image: gera os pedaços de texto da
+    resposta conforme o modelo os produz, em vez de esperar o generate terminar.
+    """
+
+    processor = get_blip_processor()
+    inputs, _ = get_blip_preprocessor().prepare(img_pil, question, roi)
+    inputs = _to_device(inputs)
+
+    streamer = TextIteratorStreamer(
+        processor.tokenizer, skip_special_tokens=True, timeout=STREAM_TIMEOUT
+    )
+    errors = []
+
+    def _generate():
+        try:
+            # O autocast é por thread, então precisa ser aberto dentro da thread de geração
+            with autocast(device_type="cuda"):
+                get_blip_model().generate(**inputs, streamer=streamer)
+        except Exception as e:
+            # Sem isso o consumidor ficaria esperando tokens para sempre
+            errors.append(e)
+            streamer.end()
+
+    generation_thread = Thread(target=_generate, daemon=True)
+    generation_thread.start()
+
+    for text_chunk in streamer:
+        if text_chunk:
+            yield text_chunk
+
+    generation_thread.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+
+
+class BlipPreprocessor:
+    """
+    Pré-processamento da imagem para o BLIP fora da thread de inferência.
+
+    Recorta a região de interesse, reduz direto para o tamanho de entrada do
+    modelo com um resampler rápido e monta os tensores (normalizados e, com
+    GPU, em memória pinned) num pool de threads. Assim o preprocess do próximo
+    pedido roda enquanto o `generate` do atual ainda está rodando (ver
+    get_info_from_image em blip_model_run.py).
+    """
+
+    def __init__(
+        self, processor, workers: int = 2, resample=Image.BILINEAR, pin_memory=None
+    ):
+        """
+        Args:
+            processor: BlipProcessor (usa o tokenizer e a config do image_processor).
+            workers (int): Threads de pré-processamento.
+            resample: Filtro do PIL usado na redução.
+            pin_memory: Se None, usa memória pinned quando houver GPU.
+        """
+        self.processor = processor
+        self.resample = resample
+
+        image_processor = processor.image_processor
+        self.size = (image_processor.size["width"], image_processor.size["height"])
+        self.scale = float(image_processor.rescale_factor)
+        self.mean = np.array(image_processor.image_mean, dtype=np.float32)
+        self.std = np.array(image_processor.image_std, dtype=np.float32)
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def prepare(self, img_pil, question: str, roi=None):
+        """
+        Pré-processa de forma síncrona.
+
+        Args:
+            img_pil: Imagem PIL (captura da janela) ou caminho da imagem.
+            question (str): Pergunta para o modelo.
+            roi: Retângulo (left, top, right, bottom) a recortar, ou None.
+
+        Returns:
+            tuple: (inputs, segundos gastos no pré-processamento)
+        """
+        start = time.perf_counter()
+
+        if not isinstance(img_pil, Image.Image):
+            # Caminho: a decodificação também fica fora da thread do modelo
+            img_pil = Image.open(img_pil)
+        if roi is not None:
+            img_pil = img_pil.crop(roi)
+        if img_pil.mode != "RGB":
+            img_pil = img_pil.convert("RGB")
+
+        # reducing_gap faz uma redução inteira (box) antes do filtro, bem mais
+        # barato para capturas muito maiores que 384x384
+        img_pil = img_pil.resize(self.size, self.resample, reducing_gap=2.0)
+
+        pixels = np.asarray(img_pil, dtype=np.float32) * self.scale
+        pixels = (pixels - self.mean) / self.std
+        pixel_values = torch.from_numpy(pixels.transpose(2, 0, 1).copy()).unsqueeze(0)
+
+        # Igual ao BlipProcessor: o generate do BLIP não aceita token_type_ids
+        inputs = dict(
+            self.processor.tokenizer(
+                question, return_tensors="pt", return_token_type_ids=False
+            )
+        )
+        inputs["pixel_values"] = pixel_values
+
+        if self.pin_memory:
+            inputs = {key: value.pin_memory() for key, value in inputs.items()}
+
+        return inputs, time.perf_counter() - start
+
+    def submit(self, img_pil, question: str, roi=None):
+        """
+        Agenda o pré-processamento no pool. Retorna um Future de prepare().
+        """
+        return self._executor.submit(self.prepare, img_pil, question, roi)
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+class PipelineStats:
+    """
+    Tempo de pré-processamento vs. modelo de um pipeline de pedidos e o ganho
+    da sobreposição entre os dois.
+
+    `busy_s` é o tempo de parede com pelo menos um pedido em andamento; sem
+    sobreposição ele seria preprocess_s + model_s, então a razão entre os dois
+    é o ganho de throughput em relação a rodar tudo em sequência.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.preprocess_s = 0.0
+        self.model_s = 0.0
+        self.busy_s = 0.0
+        self._in_flight = 0
+        self._busy_start = None
+
+    def start(self) -> None:
+        """Marca a entrada de um pedido no pipeline (antes do pré-processamento)."""
+        with self._lock:
+            if self._in_flight == 0:
+                self._busy_start = time.perf_counter()
+            self._in_flight += 1
+
+    def finish(self, preprocess_s: float, model_s: float) -> None:
+        """Marca a saída de um pedido, com os tempos gastos em cada etapa."""
+        with self._lock:
+            self.requests += 1
+            self.preprocess_s += preprocess_s
+            self.model_s += model_s
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self.busy_s += time.perf_counter() - self._busy_start
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            busy = self.busy_s
+            if self._in_flight:
+                busy += time.perf_counter() - self._busy_start
+            return {
+                "requests": self.requests,
+                "preprocess_s": self.preprocess_s,
+                "model_s": self.model_s,
+                "busy_s": busy,
+                "throughput_rps": self.requests / busy if busy else 0.0,
+                "speedup_vs_sequential": (
+                    (self.preprocess_s + self.model_s) / busy if busy else 0.0
+                ),
+            }
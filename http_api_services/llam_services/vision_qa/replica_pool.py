@@ -0,0 +1,336 @@
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from huggingface_hub import snapshot_download
+
+from http_api_services._http_api_utils.generic_service_initializer import HttpError
+
+# Só o necessário para montar o modelo a partir do safetensors
+_MODEL_FILES = ["*.json", "*.txt", "model.safetensors"]
+
+
+def _memory_usage() -> dict:
+    """
+    Memória do processo em MB. No Linux separa a parte anônima (privada) da
+    parte mapeada de arquivos (pesos via mmap) e inclui o PSS, em que cada
+    página compartilhada é dividida entre os processos que a mapeiam: somando
+    o PSS das réplicas, a cópia única dos pesos entra uma vez só.
+    """
+    try:
+        usage = {}
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile"):
+                    usage[f"{key.lower()}_mb"] = int(value.split()[0]) / 1024
+        try:
+            with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in ("Pss", "Pss_Anon", "Pss_File"):
+                        usage[f"{key.lower()}_mb"] = int(value.split()[0]) / 1024
+        except OSError:
+            # Kernel sem smaps_rollup (< 4.14)
+            pass
+        return usage
+    except OSError:
+        import psutil
+
+        info = psutil.Process().memory_full_info()
+        usage = {"vmrss_mb": info.rss / 1024 / 1024, "uss_mb": info.uss / 1024 / 1024}
+        if hasattr(info, "pss"):
+            usage["pss_mb"] = info.pss / 1024 / 1024
+        return usage
+
+
+def _pin_to_cores(cores) -> None:
+    try:
+        os.sched_setaffinity(0, cores)
+    except AttributeError:
+        # Windows/macOS não têm sched_setaffinity
+        try:
+            import psutil
+
+            psutil.Process().cpu_affinity(list(cores))
+        except Exception as e:
+            logging.warning(f"Não foi possível fixar a réplica nos cores {cores}: {e}")
+
+
+def _replica_main(replica_id, cores, model_dir, requests, results, idle):
+    # Imports pesados só dentro do processo da réplica
+    import torch
+    from PIL import Image
+    from transformers import BlipProcessor
+
+    from http_api_services.llam_services.vision_qa.image_preprocessing import (
+        BlipPreprocessor,
+        PipelineStats,
+    )
+    from http_api_services.llam_services.vision_qa.shared_weights import (
+        load_blip_shared,
+    )
+
+    start = time.perf_counter()
+    _pin_to_cores(cores)
+    torch.set_num_threads(len(cores))
+
+    processor = BlipProcessor.from_pretrained(model_dir)
+    model = load_blip_shared(model_dir)
+    preprocessor = BlipPreprocessor(processor, workers=1, pin_memory=False)
+    memory_after_load = _memory_usage()
+
+    # Warm-up: um generate completo faz as páginas dos pesos (mmap) serem
+    # carregadas de fato; antes disso o RSS/PSS não mostra o custo real
+    warmup_start = time.perf_counter()
+    inputs, _ = preprocessor.prepare(Image.new("RGB", preprocessor.size), "warm up")
+    with torch.inference_mode():
+        model.generate(**inputs)
+    warmup_s = time.perf_counter() - warmup_start
+
+    results.put(
+        (
+            "ready",
+            replica_id,
+            {
+                "pid": os.getpid(),
+                "cores": sorted(cores),
+                "startup_s": time.perf_counter() - start,
+                "warmup_s": warmup_s,
+                "memory_after_load": memory_after_load,
+                "memory": _memory_usage(),
+            },
+        )
+    )
+
+    stats = PipelineStats()
+
+    def submit(item):
+        request_id, image_path, question, roi = item
+        stats.start()
+        return request_id, preprocessor.submit(image_path, question, roi)
+
+    # Double buffering: enquanto o generate do pedido atual roda, o próximo
+    # pedido é pré-processado na thread do preprocessor. Só se adianta um
+    # pedido da fila compartilhada quando nenhuma réplica está ociosa; senão
+    # ele fica para a réplica livre, que responde sem esperar este generate.
+    pending = None
+    stop = False
+    while not stop:
+        if pending is None:
+            with idle.get_lock():
+                idle.value += 1
+            item = requests.get()
+            with idle.get_lock():
+                idle.value -= 1
+            if item is None:
+                break
+            pending = submit(item)
+
+        request_id, future = pending
+        pending = None
+        if idle.value == 0:
+            try:
+                item = requests.get_nowait()
+            except queue.Empty:
+                item = False
+            if item is None:
+                stop = True
+            elif item:
+                pending = submit(item)
+
+        prep_time = model_time = 0.0
+        try:
+            inputs, prep_time = future.result()
+            model_start = time.perf_counter()
+            with torch.inference_mode():
+                out = model.generate(**inputs)
+            model_time = time.perf_counter() - model_start
+            answer = processor.decode(out[0], skip_special_tokens=True)
+            results.put(("result", request_id, answer, None))
+        except Exception as e:
+            results.put(("result", request_id, None, str(e)))
+        finally:
+            stats.finish(prep_time, model_time)
+
+        results.put(
+            ("stats", replica_id, {**stats.as_dict(), "memory": _memory_usage()})
+        )
+
+
+class VisionQAReplicaPool:
+    """
+    Serve o vision QA com N processos de modelo, cada um fixado num conjunto
+    de cores de CPU e alimentado por uma fila limitada.
+
+    Os pesos são lidos do safetensors via mmap (ver shared_weights), então as
+    réplicas compartilham uma única cópia física dos pesos. Quando a fila está
+    cheia, ask() falha na hora com HttpError 429 em vez de acumular pedidos.
+
+    Configuração via variáveis de ambiente (ver vision_qa/.env):
+        VISION_QA_MODEL              -> repo do modelo (Salesforce/blip-vqa-base)
+        VISION_QA_REPLICAS           -> número de réplicas
+        VISION_QA_CORES_PER_REPLICA  -> cores por réplica (padrão: divide igualmente)
+        VISION_QA_QUEUE_SIZE         -> tamanho da fila de pedidos
+        VISION_QA_TIMEOUT            -> timeout (s) de cada pedido
+    """
+
+    def __init__(
+        self,
+        n_replicas: int = None,
+        cores_per_replica: int = None,
+        queue_size: int = None,
+        timeout: float = None,
+    ):
+        available_cores = sorted(
+            os.sched_getaffinity(0)
+            if hasattr(os, "sched_getaffinity")
+            else range(os.cpu_count())
+        )
+
+        self.n_replicas = n_replicas or int(os.getenv("VISION_QA_REPLICAS", 2))
+        cores_per_replica = cores_per_replica or int(
+            os.getenv(
+                "VISION_QA_CORES_PER_REPLICA",
+                max(1, len(available_cores) // self.n_replicas),
+            )
+        )
+        queue_size = queue_size or int(os.getenv("VISION_QA_QUEUE_SIZE", 16))
+        self.timeout = timeout or float(os.getenv("VISION_QA_TIMEOUT", 60))
+
+        # Baixa os arquivos uma vez só, antes de subir as réplicas
+        model_dir = snapshot_download(
+            os.getenv("VISION_QA_MODEL", "Salesforce/blip-vqa-base"),
+            cache_dir="./models/blip_cache_model",
+            allow_patterns=_MODEL_FILES,
+        )
+
+        ctx = mp.get_context("spawn")
+        self._requests = ctx.Queue(maxsize=queue_size)
+        self._results = ctx.Queue()
+        # Réplicas paradas esperando pedido (decide se vale adiantar o próximo)
+        self._idle = ctx.Value("i", 0)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self.replica_stats = {}
+
+        start = time.perf_counter()
+        self._processes = []
+        for replica_id in range(self.n_replicas):
+            # Réplicas além do número de cores reaproveitam os cores em round-robin
+            cores = {
+                available_cores[(replica_id * cores_per_replica + i) % len(available_cores)]
+                for i in range(cores_per_replica)
+            }
+            process = ctx.Process(
+                target=_replica_main,
+                args=(
+                    replica_id,
+                    cores,
+                    model_dir,
+                    self._requests,
+                    self._results,
+                    self._idle,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._ready = threading.Event()
+        self._collector.start()
+
+        while not self._ready.wait(1):
+            if any(not process.is_alive() for process in self._processes):
+                self.shutdown()
+                raise RuntimeError("A vision QA replica died during startup")
+        self.startup_s = time.perf_counter() - start
+        logging.info(
+            f"vision_qa: {self.n_replicas} réplicas prontas em {self.startup_s:.1f}s "
+            f"{self.replica_stats}"
+        )
+
+    def ask(self, image_path: str, question: str, roi=None) -> str:
+        """
+        Envia um pedido para as réplicas e espera a resposta.
+
+        Raises:
+            HttpError: 429 se a fila estiver cheia, 504 se estourar o timeout.
+        """
+        request_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+
+        try:
+            self._requests.put_nowait((request_id, image_path, question, roi))
+        except queue.Full:
+            with self._pending_lock:
+                del self._pending[request_id]
+            raise HttpError("Vision QA queue is full, try again later", 429)
+
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise HttpError("Vision QA request timed out", 504)
+
+    def stats(self) -> dict:
+        try:
+            queued = self._requests.qsize()
+        except NotImplementedError:
+            # qsize não existe no macOS
+            queued = None
+        # Soma do PSS: memória real do pool, com os pesos compartilhados contados uma vez
+        pss = [stats["memory"].get("pss_mb") for stats in self.replica_stats.values()]
+        return {
+            "replicas": self.n_replicas,
+            "startup_s": self.startup_s,
+            "queued": queued,
+            "total_pss_mb": sum(pss) if pss and None not in pss else None,
+            "replica_stats": self.replica_stats,
+        }
+
+    def shutdown(self) -> None:
+        for process in self._processes:
+            if process.is_alive():
+                self._requests.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message[0] == "ready":
+                _, replica_id, stats = message
+                self.replica_stats[replica_id] = stats
+                if len(self.replica_stats) == self.n_replicas:
+                    self._ready.set()
+                continue
+
+            if message[0] == "stats":
+                _, replica_id, stats = message
+                self.replica_stats[replica_id].update(stats)
+                continue
+
+            _, request_id, answer, error = message
+            with self._pending_lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                # Pedido já expirou do lado do cliente
+                continue
+            if error is not None:
+                future.set_exception(HttpError(error, 400))
+            else:
+                future.set_result(answer)
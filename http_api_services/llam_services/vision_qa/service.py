@@ -0,0 +1,52 @@
+import os
+
+from dotenv import load_dotenv
+
+from http_api_services._http_api_utils.generic_service_initializer import (
+    create_flask_service,
+)
+from http_api_services.llam_services.vision_qa.replica_pool import VisionQAReplicaPool
+
+load_dotenv("./http_api_services/llam_services/vision_qa/.env")
+
+
+def vision_qa_handler(manager, request):
+    data = request.get_json()
+    image = data.get("image")  # path para uma imagem existente
+    question = data.get("question")
+    roi = data.get("roi")
+
+    if not image or not question:
+        raise ValueError("image and question are required")
+
+    answer = manager.ask(image, question, roi)
+    return {"message": "ok", "answer": answer}
+
+
+def vision_qa_stats_handler(manager, request):
+    return manager.stats()
+
+
+# `manager_cls` e `routes` também são usados pelo ServiceHost
+manager_cls = VisionQAReplicaPool
+routes = [
+    {
+        "endpoint": "/vision-qa",
+        "methods": ["POST"],
+        "handler": vision_qa_handler,
+    },
+    {
+        "endpoint": "/vision-qa-stats",
+        "methods": ["GET"],
+        "handler": vision_qa_stats_handler,
+    },
+]
+
+
+if __name__ == "__main__":
+    port = int(os.getenv("PORT", 5002))
+
+    app = create_flask_service(manager_cls, routes, port=port, debug=False)
+    # threaded: cada pedido espera sua réplica numa thread própria do Flask.
+    # Sem debug/reloader, que subiria as réplicas duas vezes.
+    app.run(port=port, debug=False, threaded=True)
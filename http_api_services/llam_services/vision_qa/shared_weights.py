@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import struct
+
+import torch
+from transformers import BlipConfig, BlipForQuestionAnswering
+from transformers.modeling_utils import no_init_weights
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def load_safetensors_mmap(path: str) -> dict:
+    """
+    Abre um arquivo safetensors via mmap, sem copiar os pesos para a memória
+    do processo.
+
+    O arquivo é mapeado como privado (copy-on-write) e os tensores são views
+    dele. Como os pesos só são lidos, todos os processos que mapeiam o mesmo
+    arquivo compartilham as mesmas páginas do page cache: uma cópia física
+    para N réplicas.
+
+    Returns:
+        dict: nome -> tensor (CPU) apontando para o arquivo mapeado.
+    """
+    with open(path, "rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+    header.pop("__metadata__", None)
+
+    nbytes = os.path.getsize(path)
+    storage = torch.UntypedStorage.from_file(str(path), False, nbytes)
+    data_start = 8 + header_len
+
+    tensors = {}
+    for name, info in header.items():
+        dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        raw = torch.empty(0, dtype=torch.uint8).set_(
+            storage, data_start + start, (end - start,)
+        )
+        try:
+            tensor = raw.view(dtype)
+        except RuntimeError:
+            # Offset desalinhado para o dtype: cai para uma cópia só deste tensor
+            logging.warning(f"Tensor {name} desalinhado no safetensors, copiando.")
+            tensor = raw.clone().view(dtype)
+        tensors[name] = tensor.reshape(info["shape"])
+
+    return tensors
+
+
+def load_blip_shared(model_dir: str, weights_file: str = "model.safetensors"):
+    """
+    Monta o BlipForQuestionAnswering com os parâmetros apontando direto para o
+    safetensors mapeado em memória (ver load_safetensors_mmap).
+
+    Args:
+        model_dir (str): Pasta com config.json e o arquivo de pesos.
+        weights_file (str): Nome do arquivo safetensors dentro de model_dir.
+    """
+    config = BlipConfig.from_pretrained(model_dir)
+
+    # no_init_weights evita a inicialização aleatória: a memória dos parâmetros
+    # nunca é tocada e é liberada quando os tensores mapeados são atribuídos
+    with no_init_weights():
+        model = BlipForQuestionAnswering(config)
+
+    state_dict = load_safetensors_mmap(os.path.join(model_dir, weights_file))
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    if missing:
+        logging.warning(f"Pesos ausentes no safetensors: {missing}")
+    if unexpected:
+        logging.warning(f"Pesos inesperados no safetensors: {unexpected}")
+
+    model.tie_weights()
+    return model.eval()
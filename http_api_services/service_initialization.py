@@ -1,9 +1,30 @@
 from http_api_services._http_api_utils.generic_service_initializer import (
     create_flask_service,
 )
+
 from http_api_services.action_services.local_folders_comm_manager.manager import (
     LocalFoldersCommManager,
 )
+from http_api_services.action_services.vkb_manager.ingestion import (
+    VKBIngestionPipeline,
+)
+from http_api_services.action_services.vkb_manager.manager import get_vector_store
+from http_api_services.llam_services._llam_utils.all_llam_acli.command_stream_parser import (
+    IncrementalCommandParser,
+)
+
+
+class IndexedLocalFoldersCommManager(LocalFoldersCommManager):
+    """
+    LocalFoldersCommManager que mantém a base vetorial (vkb) atualizada a cada
+    create/update/delete de task, info e script.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.vkb_ingestion = VKBIngestionPipeline(get_vector_store())
+        self.add_hook(self.vkb_ingestion.on_file_event)
+
 
 # BASE HANDLERS
 
@@ -14,6 +35,37 @@ def action_handler(): ...
 def llam_handler(): ...
 
 
+def llam_stream_handler(manager, request):
+    # Imports pesados (modelos) só quando a rota é usada, para que o
+    # files-manager suba sem eles
+    from PIL import Image
+
+    from http_api_services.llam_services._llam_utils.all_llam_acli.llam_mapping import (
+        run_inference_stream,
+    )
+
+    data = request.get_json()
+    llm_model = data.get("llm_model")
+    # Cópia para não alterar o payload de quem chamou
+    kwargs = dict(data.get("kwargs", {}))
+
+    # Para o vision_qa, "image" é um path para uma imagem existente
+    if "image" in kwargs:
+        kwargs["image"] = Image.open(kwargs["image"]).convert("RGB")
+
+    def events():
+        parser = IncrementalCommandParser()
+        for token in run_inference_stream(llm_model, **kwargs):
+            yield {"token": token}
+            # Cada comando é enviado assim que fecha, antes do fim da geração
+            for command in parser.feed(token):
+                yield {"command": command}
+        parser.close()
+        yield {"done": True}
+
+    return events()
+
+
 def local_folders_handler(manager, request):
     data = request.get_json()
     operation = data.get("operation")
@@ -28,6 +80,7 @@ def local_folders_handler(manager, request):
     tipo = data.get("tipo")
     recursive = data.get("recursive", False)
     script_ext = data.get("script_ext")
+    frame = data.get("frame")
 
     # Executa a lógica do manager
     result = manager.handle_operation(
@@ -43,21 +96,31 @@ def local_folders_handler(manager, request):
         tipo=tipo,
         recursive=recursive,
         script_ext=script_ext,
+        frame=frame,
     )
 
     return result
 
 
+# Configuração das rotas do serviço principal. `manager_cls` e `routes` também
+# são usados pelo ServiceHost para hospedar este serviço in-process.
+manager_cls = IndexedLocalFoldersCommManager
+routes = [
+    {
+        "endpoint": "/files-manager",
+        "methods": ["POST"],
+        "handler": local_folders_handler,
+    },
+    {
+        "endpoint": "/llam-stream",
+        "methods": ["POST"],
+        "handler": llam_stream_handler,
+        "stream": True,
+    },
+]
+
+
 if __name__ == "__main__":
-    # Configuração da rota para o serviço local_folders_comm_manager
-    routes = [
-        {
-            "endpoint": "/files-manager",
-            "methods": ["POST"],
-            "handler": local_folders_handler,
-        }
-    ]
-
-    app = create_flask_service(LocalFoldersCommManager, routes, port=5000, debug=True)
+    app = create_flask_service(manager_cls, routes, port=5000, debug=True)
     # Inicia o servidor Flask
     app.run(port=5000, debug=True)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from http_api_services.action_services.vkb_manager.vector_store import VectorStore
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_generated_ids_do_not_collide_after_compact(tmp_path):
+    store = VectorStore(tmp_path, dim=8, compact_min_rows=1)
+    ids = store.add(_vectors(20))
+    store.delete(ids[:10])  # mais de compact_ratio deletado -> compacta
+    assert store.count == 10
+
+    new_ids = store.add(_vectors(5, seed=1))
+    assert not set(new_ids) & set(ids)
+    assert len(store) == 15
+
+    # O contador sobrevive à reabertura da base
+    store.close()
+    reopened = VectorStore(tmp_path)
+    assert not set(reopened.add(_vectors(1, seed=2))) & set(ids + new_ids)
+    assert len(reopened) == 16
+
+
+def test_generated_ids_skip_explicit_ids(tmp_path):
+    store = VectorStore(tmp_path, dim=8)
+    store.add(_vectors(1), ids=["0"])
+    assert store.add(_vectors(2, seed=1)) == ["1", "2"]
+    assert len(store) == 3
+
+
+def test_duplicate_ids_in_batch_last_wins(tmp_path):
+    store = VectorStore(tmp_path, dim=8)
+    store.add(_vectors(2), ids=["dup", "dup"], metadatas=[{"v": 1}, {"v": 2}])
+    assert len(store) == 1
+    assert store.get(["dup"]) == [{"v": 2}]
+
+
+def test_second_open_of_same_path_fails(tmp_path):
+    store = VectorStore(tmp_path, dim=8)
+    with pytest.raises(RuntimeError):
+        VectorStore(tmp_path)
+    store.close()
+    VectorStore(tmp_path).close()